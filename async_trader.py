@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+import pandas as pd
+
+from trader import Trader
+
+# AsyncTrader is the asyncio counterpart of Trader, meant to be inherited in the same way
+# for automated trading on platforms with asynchronous APIs
+#
+# Data is consumed from an asynchronous source while processing and prediction run in an
+# executor, so the event loop stays responsive. Data that arrives while the previous data
+# is still being processed is queued and processed together in a single update once it
+# is done, so a burst of data never builds a backlog of updates; orders are therefore
+# placed at most one update behind the latest data
+#
+# make_buy_transaction and make_sell_transaction are coroutines rather than functions
+#
+# As with Trader, each piece of data should be adapted into either the full history or
+# only the new rows; the latter requires processor_incremental
+#
+# Sample flow / code:
+#
+# class ABCTrader(AsyncTrader): ...
+# predictor = Predictor( ... )
+# trader = ABCTrader(predictor, processor_incremental = True)
+# asyncio.run(trader.run( ... some asynchronous iterable of newly received data ... ))
+
+class AsyncTrader(Trader):
+    # Processing and prediction run in executor, which by default is a single thread;
+    # updates are never processed concurrently, as they depend on the previous ones
+    def __init__(self, predictor, executor = None, **kwargs):
+        super().__init__(predictor, **kwargs)
+
+        self._executor = executor if executor is not None else ThreadPoolExecutor(max_workers = 1)
+        self._pending = []
+        self._pending_event = None
+        self._feed_done = False
+        self._stats = { "received": 0, "updates": 0, "orders": 0, "max_latency": 0.0 }
+
+    # Consume every piece of data from feed, an asynchronous iterable, processing and
+    # trading on it until feed is exhausted
+    #
+    # An error raised while processing or placing an order stops the feed and is raised
+    async def run(self, feed):
+        self._pending_event = asyncio.Event()
+        self._feed_done = False
+        processor = asyncio.ensure_future(self._process_pending())
+
+        try:
+            async for data in feed:
+                self._pending.append((time.perf_counter(), data))
+                self._stats["received"] += 1
+                self._pending_event.set()
+
+                # A feed that never suspends would otherwise keep the processor from running
+                await asyncio.sleep(0)
+
+                # Stop consuming the feed as soon as processing fails, raising its error
+                if processor.done():
+                    processor.result()
+
+            self._feed_done = True
+            self._pending_event.set()
+            await processor
+        finally:
+            processor.cancel()
+
+    # Returns the number of pieces of data received, updates made (each processing one or
+    # more pieces of data), orders placed, and the longest time in seconds between data
+    # arriving and the order made on it being placed
+    def get_stats(self):
+        return dict(self._stats)
+
+    # Place an order based on the signal, as Trader.make_transaction does
+    #
+    # In this sample function: Buy at minima, sell at maxima
+    #
+    # Should be overriden by the child class for more complex logic
+    async def dispatch_transaction(self, signal):
+        if signal == -1:
+            await self.make_buy_transaction()
+        elif signal == 1:
+            await self.make_sell_transaction()
+
+    # To be implemented by the child class, as a coroutine
+    async def make_buy_transaction(self):
+        raise NotImplementedError
+
+    # To be implemented by the child class, as a coroutine
+    async def make_sell_transaction(self):
+        raise NotImplementedError
+
+    # Adapt every piece of data processed in one update into a single dataframe; later
+    # rows replace earlier rows of the same date
+    #
+    # Can be overriden by the child class to adapt all of the data at once
+    def adapt_data_batch(self, data):
+        if len(data) == 1:
+            return self.adapt_data(data[0])
+
+        df = pd.concat([self.adapt_data(d) for d in data]).drop_duplicates("Date", keep = "last")
+        df.sort_values("Date", inplace = True, kind = "stable")
+        df.reset_index(drop = True, inplace = True)
+        return df
+
+    async def _process_pending(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            if not self._pending:
+                if self._feed_done:
+                    return
+
+                await self._pending_event.wait()
+                self._pending_event.clear()
+                continue
+
+            batch, self._pending = self._pending, []
+            signal = await loop.run_in_executor(self._executor, self._update, [data for _, data in batch])
+            self._stats["updates"] += 1
+
+            await self.dispatch_transaction(signal)
+
+            if signal in (-1, 1):
+                # Latency is measured from the arrival of the oldest data in the update to
+                # the order being placed
+                self._stats["max_latency"] = max(self._stats["max_latency"], time.perf_counter() - batch[0][0])
+                self._stats["orders"] += 1
+
+    # Runs in the executor; returns the current signal after processing the data, or 0
+    # if there is not enough data yet to predict from (e.g. while warming up)
+    def _update(self, data):
+        self.update_adapted_data(self.adapt_data_batch(data))
+
+        if len(self._df) == 0:
+            return 0
+        return self.current_signal()
@@ -3,75 +3,73 @@ from visualizer import Visualizer
 
 import backtest_strategy as strategy
 import data_processor
+import profiler
 
 def predict_extremas(data_file_path,
-        data_year_range = None, data_hourly = False,
-        extrema_n = 20):
+        data_year_range = None, data_hourly = None,
+        extrema_n = 20, walk_forward = False, cache_dir = None):
 
-    # Use the data processor to get the data frame for actual data
-    df = data_processor.read_data(data_file_path, data_year_range, True, data_hourly, extrema_n, False)
+    # Use the data processor to get the data frame for actual data, with only the
+    # indicators used by the model
+    df = data_processor.read_data(data_file_path, data_year_range, True, data_hourly, extrema_n, False, cache_dir,
+        columns = Predict.FEATURE_COLUMNS)
 
     # Use optional keyword for readability
-    predict = Predict(
-        "models/model.joblib",
-        k_neighbors = 5,
-        max_conflicts = 2,
-        search_distance = 26
-    )
+    with profiler.stage("load_model"):
+        predict = Predict(
+            "models/model.joblib",
+            k_neighbors = 5,
+            max_conflicts = 2,
+            search_distance = 26
+        )
     Predict.preprocess_data(df)
 
-    # This block of code is only for testing the predict_point function in Predict.
-    # Uncomment this block of code and remove the call to predict_full following this
-    # test block.
-    #
-    # Observe that its results is the same as using the full prediction.
-    # It will run significantly slower than predict_full as it is meant to be used to
-    # predict single points in a dataframe only for a faster speed.
-    #
-    # Begin code block
-    #
-    # df_features = Predict.feature_attributes(df)
-    # results = {}
-    # for i in range(len(df)):
-    #     results[i] = predict.predict_point(df, df_features, i)
-    # for i, e in results.items():
-    #     df.loc[i, "Extrema"] = e
-    #
-    # End code block
-
-    removed_extremas = predict.predict_full(df, Predict.feature_attributes(df))
+    # Walk-forward prediction gives the same results as calling predict_point for every
+    # index, where each extrema is only validated with data that was available at its
+    # point in time, and runs in about the same time as predict_full
+    with profiler.stage("predict", len(df)):
+        if walk_forward:
+            removed_extremas = predict.predict_walk_forward(df, Predict.feature_attributes(df))
+        else:
+            removed_extremas = predict.predict_full(df, Predict.feature_attributes(df))
     print("Extremas removed from originally predicted model via heuristic:", removed_extremas)
 
-    removed_extremas = strategy.alternate_extremas(df)
+    with profiler.stage("strategy", len(df)):
+        removed_extremas = strategy.alternate_extremas(df)
+        strategy.end_with_sell(df)
     print("Extremas removed from originally predicted model via strategy:", removed_extremas)
 
-    strategy.end_with_sell(df)
-
     return df
 
-def visualize_data(df):
-    viz = Visualizer("Overall Predictive Backtest", 2, [3, 1])
+# Show the backtest, or save it to output_file (e.g. a PNG) without a display
+def visualize_data(df, output_file = None):
+    viz = Visualizer("Overall Predictive Backtest", 2, [3, 1], headless = output_file is not None)
 
     [plot(df, viz) for plot in (plot_price, plot_transaction_summary)]
     viz.show_last_x_axis_only()
-    viz.show()
+
+    if output_file is not None:
+        viz.save(output_file)
+    else:
+        viz.show()
 
 def plot_price(df, viz):
     minima = df.loc[df["Extrema"] == -1]
     maxima = df.loc[df["Extrema"] == 1]
 
     def price_callback(ax):
-        # HLCAverage as price
-        ax.plot(df["Date"], df["HLCAverage"])
+        # HLCAverage as price, decimated with the extremas kept on the line
+        viz.plot_line(ax, df["Date"], df["HLCAverage"], keep = df["Extrema"] != 0)
 
         # Price Extrema
-        ax.scatter(minima["Date"], minima["HLCAverage"], c = "g")
-        ax.scatter(maxima["Date"], maxima["HLCAverage"], c = "r")
+        viz.plot_points(ax, minima["Date"], minima["HLCAverage"], "g")
+        viz.plot_points(ax, maxima["Date"], maxima["HLCAverage"], "r")
 
     viz.fill_next_axis(price_callback, "Price", ["HLC Average", "Model Buy", "Model Sell"])
 
 def plot_transaction_summary(df, viz):
-    df_summary = strategy.generate_tx_summary(df)
+    with profiler.stage("tx_summary", len(df)):
+        df_summary = strategy.generate_tx_summary(df)
     print(df_summary)
 
     buy = df_summary.loc[df_summary["Extrema"] == -1]
@@ -81,11 +79,11 @@ def plot_transaction_summary(df, viz):
 
     def tx_callback(ax):
         # Plot each buy and sell transaction
-        ax.scatter(buy["Date"], buy["ProfitLoss"], c = "g")
-        ax.scatter(sell["Date"], sell["ProfitLoss"], c = "r")
+        viz.plot_points(ax, buy["Date"], buy["ProfitLoss"], "g")
+        viz.plot_points(ax, sell["Date"], sell["ProfitLoss"], "r")
 
         # Replot summary in its entirety to generate a line
-        ax.plot(df_summary["Date"], df_summary["ProfitLoss"])
+        viz.plot_line(ax, df_summary["Date"], df_summary["ProfitLoss"])
 
         # Use same range as the price plot by copying the limits of the
         # x axis of the price plot (first plot/axis of the figure)
@@ -99,10 +97,10 @@ def main():
     data_file_path = "datasets/Coinbase_BTCUSD_1h.csv"
     data_year_range = (2019,)
 
-    df_backtest = predict_extremas(data_file_path, data_year_range, True)
+    df_backtest = predict_extremas(data_file_path, data_year_range, cache_dir = data_processor.CACHE_DIR)
     print(df_backtest)
 
     visualize_data(df_backtest)
 
 if __name__ == "__main__":
-    main()
+    profiler.run_main(main)
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 from predict import Predict
@@ -13,21 +14,11 @@ from predict import Predict
 # than the previous minima's price or value), in the case that a user enforces
 # this rule in a real world trading situation
 def alternate_extremas(df, sell_at_loss = False):
-    remove_extremas = []
-    prev_type = 1 # Say the previous type is a maxima so that it must start with a buy (minima)
-    prev_value = 0
-
-    for i, row in df.iterrows():
-        extrema_type = row["Extrema"]
-        value = row["HLCAverage"]
-        if extrema_type == 0:
-            continue
-        elif extrema_type == prev_type or ((not sell_at_loss) and extrema_type == 1 and value < prev_value):
-            remove_extremas.append(i)
-            continue
-
-        prev_type, prev_value = extrema_type, value
+    extremas = df["Extrema"].to_numpy(dtype = np.float64)
+    alternated = simulate_alternate(extremas, df["HLCAverage"].to_numpy(dtype = np.float64), sell_at_loss)
 
+    # Compared with 0 rather than with extremas, as a NaN extrema never equals itself
+    remove_extremas = df.index[(alternated == 0) & (extremas != 0)]
     Predict.delete_extremas(df, remove_extremas)
     return len(remove_extremas)
 
@@ -36,9 +27,10 @@ def alternate_extremas(df, sell_at_loss = False):
 #
 # Assumes that alternate_extremas was already applied to df
 def end_with_sell(df):
-    last_extrema = df[df["Extrema"] != 0][::-1].iloc[0]
-    if last_extrema["Extrema"] == -1:
-        Predict.delete_extremas(df, last_extrema.name)
+    extremas = df["Extrema"].to_numpy(dtype = np.float64)
+    ended = simulate_end_with_sell(extremas)
+
+    Predict.delete_extremas(df, df.index[(ended == 0) & (extremas != 0)])
 
 # Used for backtesting to generate a summary of resultant of the
 # transactions made at extremas predicted by the predict module as a result
@@ -48,32 +40,134 @@ def end_with_sell(df):
 #
 # Assumes that alternate_extremas and end_with_sell have been applied to df
 def generate_tx_summary(df):
-    # As a percentange, NOT as a decimal
-    def profit_loss(current_val, start_val):
-        return ((current_val - start_val) / start_val) * 100
-
-    summary = []
-    extremas = df[df["Extrema"] != 0]
-
-    units_owned = None
-    current_val = start_val = 0
-
-    for i, row in extremas.iterrows():
-        date = row["Date"]
-        extrema_type = row["Extrema"]
-        value = row["HLCAverage"]
-
-        if extrema_type == -1: # Buy
-            if units_owned is None:
-                units_owned = 1
-                start_val = current_val = value
-            else:
-                units_owned = current_val / value
-        else: # Sell
-            current_val = value * units_owned
-            units_owned = 0
-
-        summary.append((date, extrema_type, units_owned, current_val, profit_loss(current_val, start_val)))
-
-    df_summary = pd.DataFrame(summary, columns = ["Date", "Extrema", "UnitsOwned", "Value", "ProfitLoss"])
+    columns = ["Date", "Extrema", "UnitsOwned", "Value", "ProfitLoss"]
+
+    extremas = df["Extrema"].to_numpy(dtype = np.float64)
+    units_owned, value, profit_loss = simulate_tx(extremas, df["HLCAverage"].to_numpy(dtype = np.float64))
+
+    rows = np.flatnonzero(extremas != 0)
+    if len(rows) == 0:
+        return pd.DataFrame([], columns = columns)
+
+    df_summary = pd.DataFrame({
+        "Date": df["Date"].to_numpy()[rows],
+        "Extrema": df["Extrema"].to_numpy()[rows],
+        "UnitsOwned": units_owned[rows],
+        "Value": value[rows],
+        "ProfitLoss": profit_loss[rows]
+    }, columns = columns)
+
+    # Units owned are whole numbers (1 for the first buy, 0 after every sell) until
+    # profits are reinvested in a later buy
+    if np.count_nonzero(extremas[rows] == -1) <= 1:
+        df_summary["UnitsOwned"] = df_summary["UnitsOwned"].astype(np.int64)
+
     return df_summary
+
+# Simulator for the strategies above, working on NumPy arrays of extremas and prices
+# rather than on dataframes
+#
+# extremas may be a single array or a two dimensional array of many variants (e.g. the
+# predictions of many parameter combinations, one per row) over the same prices. The
+# rows with an extrema in any variant are stepped through once, in order, applying the
+# row by row logic to every variant at once, so the extremas kept, units, values and
+# ProfitLoss are identical to it
+
+# Returns a copy of extremas with alternate_extremas applied
+def simulate_alternate(extremas, prices, sell_at_loss = False):
+    extremas, variants = _as_variants(extremas)
+    prices = np.asarray(prices, dtype = np.float64)
+
+    # Say the previous type is a maxima so that it must start with a buy (minima)
+    prev_type = np.ones(len(extremas))
+    prev_value = np.zeros(len(extremas))
+
+    for position in _extrema_positions(extremas):
+        extrema_type, value = extremas[:, position], prices[position]
+
+        active = extrema_type != 0
+        remove = active & (
+            (extrema_type == prev_type) | ((not sell_at_loss) & (extrema_type == 1) & (value < prev_value))
+        )
+        keep = active & ~remove
+
+        extremas[remove, position] = 0
+        prev_type = np.where(keep, extrema_type, prev_type)
+        prev_value = np.where(keep, value, prev_value)
+
+    return extremas if variants else extremas[0]
+
+# Returns a copy of extremas with end_with_sell applied
+def simulate_end_with_sell(extremas):
+    extremas, variants = _as_variants(extremas)
+
+    nonzero = extremas != 0
+    last = extremas.shape[1] - 1 - np.argmax(nonzero[:, ::-1], axis = 1)
+    ends_with_buy = nonzero.any(axis = 1) & (extremas[np.arange(len(extremas)), last] == -1)
+    extremas[ends_with_buy, last[ends_with_buy]] = 0
+
+    return extremas if variants else extremas[0]
+
+# Returns the units owned, value and ProfitLoss after the transaction at every extrema,
+# as arrays of the same shape as extremas with NaN where there is no extrema, as in
+# generate_tx_summary
+#
+# Anything other than a minima is a sell, as by the row by row logic; a sell before any
+# buy has no units, so its value is NaN
+def simulate_tx(extremas, prices):
+    extremas, variants = _as_variants(extremas)
+    prices = np.asarray(prices, dtype = np.float64)
+
+    units_owned, value, profit_loss = [np.full(extremas.shape, np.nan) for _ in range(3)]
+
+    units = np.full(len(extremas), np.nan)
+    current_val = np.full(len(extremas), np.nan)
+    start_val = np.zeros(len(extremas))
+    bought = np.zeros(len(extremas), dtype = bool)
+
+    for position in _extrema_positions(extremas):
+        extrema_type, price = extremas[:, position], prices[position]
+
+        active = extrema_type != 0
+        buy = active & (extrema_type == -1)
+        sell = active & ~buy
+        first = buy & ~bought
+
+        current_val = np.where(first, price, np.where(sell, price * units, current_val))
+        start_val = np.where(first, price, start_val)
+        units = np.where(first, 1.0, np.where(buy, current_val / price, np.where(sell, 0.0, units)))
+        bought |= buy
+
+        units_owned[active, position] = units[active]
+        value[active, position] = current_val[active]
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            # As a percentange, NOT as a decimal
+            profit_loss[active, position] = ((current_val[active] - start_val[active]) / start_val[active]) * 100
+
+    if variants:
+        return units_owned, value, profit_loss
+    return units_owned[0], value[0], profit_loss[0]
+
+# Applies alternate_extremas and end_with_sell to every variant of extremas and
+# simulates their transactions
+#
+# Returns the final ProfitLoss (NaN without transactions) and number of transactions of
+# each variant, along with the extremas after the strategies are applied
+def simulate(extremas, prices, sell_at_loss = False):
+    extremas = simulate_end_with_sell(simulate_alternate(extremas, prices, sell_at_loss))
+    profit_loss = simulate_tx(extremas, prices)[2]
+
+    transactions = np.count_nonzero(extremas != 0, axis = -1)
+    last = extremas.shape[-1] - 1 - np.argmax((extremas != 0)[..., ::-1], axis = -1)
+    final = np.where(transactions > 0, np.take_along_axis(profit_loss, np.expand_dims(last, -1), -1)[..., 0], np.nan)
+
+    return final, transactions, extremas
+
+# Returns extremas as a two dimensional copy, and whether it already was
+def _as_variants(extremas):
+    extremas = np.array(extremas, dtype = np.float64)
+    return np.atleast_2d(extremas), extremas.ndim == 2
+
+# Returns the positions of the rows with an extrema in any variant, in order
+def _extrema_positions(extremas):
+    return np.flatnonzero((extremas != 0).any(axis = 0))
@@ -0,0 +1,342 @@
+import argparse
+import json
+import os
+import platform
+import time
+
+import numpy as np
+import pandas as pd
+
+from predict import Predict
+
+import backtest_strategy as strategy
+import data_processor
+import extrema
+import indicators
+import train
+
+# Benchmark suite of every step of the pipeline, run on the bundled data sets and on
+# synthetic data sets of increasing sizes to show how each step scales
+#
+# Results can be saved to a JSON file and later runs compared against it, e.g. to catch
+# regressions:
+#
+# python benchmark.py --save benchmarks/baseline.json
+# python benchmark.py --compare benchmarks/baseline.json
+
+# Number of rows of the synthetic data sets by default; up to 10 million can be given with
+# --sizes but needs a few GB of memory
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# Steps that loop over rows in Python are only timed up to this many rows
+SLOW_MAX_ROWS = 100000
+
+# Interval between the candles of the synthetic data sets
+SYNTHETIC_INTERVAL = "30min"
+
+# Number of points predict_point is timed on, as it is timed per call
+PREDICT_POINT_CALLS = 100
+
+# A step is reported as a regression when it is this many times slower than the baseline
+REGRESSION_RATIO = 1.25
+
+# Returns the best wall time in seconds out of the given number of calls to callback
+#
+# setup is called before each timed call and its result is passed to callback, so that
+# anything modified in place (e.g. a dataframe) can be recreated outside of the timing
+def time_call(callback, setup = lambda: None, repeat = 5):
+    best = None
+
+    for _ in range(repeat):
+        args = setup()
+
+        start = time.perf_counter()
+        callback(args)
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+# Compares merging model predictions back into the data frame row by row, as was
+# previously done by Predict._merge_data, against the current bulk assignment
+def benchmark_merge(df, predict):
+    df_features = Predict.feature_attributes(df)
+    predicted = predict.predict_with_model(df_features)
+
+    def merge_rows(df_copy):
+        for i, row in predicted.iterrows():
+            df_copy.loc[i, "Extrema"] = row["Extrema"]
+
+    def merge_bulk(df_copy):
+        predict._merge_data(df_copy, predicted)
+
+    def predict_full(df_copy):
+        predict.predict_full(df_copy, Predict.feature_attributes(df_copy))
+
+    return {
+        "Merge (row by row)": time_call(merge_rows, df.copy, 1),
+        "Merge (bulk)": time_call(merge_bulk, df.copy),
+        "predict_with_model": time_call(lambda _: predict.predict_with_model(df_features)),
+        "predict_full": time_call(predict_full, df.copy)
+    }
+
+# Compares model inference through sklearn against the compiled model, for the whole
+# data set and for the single latest row as in live trading
+def benchmark_inference(df, predict, compiled_predict):
+    df_features = Predict.feature_attributes(df)
+    latest_features = df_features.iloc[-1:]
+    latest_values = latest_features.to_numpy()[0]
+
+    return {
+        "Batch (sklearn)": time_call(lambda _: predict.predict_array(df_features)),
+        "Batch (compiled)": time_call(lambda _: compiled_predict.predict_array(df_features)),
+        "Latest row (sklearn)": time_call(lambda _: predict.predict_array(latest_features)),
+        "Latest row (compiled)": time_call(lambda _: compiled_predict.predict_features(latest_values))
+    }
+
+def print_results(title, results):
+    print(title)
+    for name, elapsed in results.items():
+        print("  {:<32}{:>12.3f} ms".format(name, elapsed * 1000))
+
+# Returns a synthetic data set of 30 minute candles of the given number of rows,
+# compatible with the data processor module, with prices following a random walk
+#
+# Candles start in 1678, the first full year pandas supports, so that 10 million of them
+# end before the last (2262); 30 minutes keeps the warm up at 1440 rows, well within the
+# smallest data set
+def synthetic_ohlcv(rows, seed = 0):
+    rng = np.random.default_rng(seed)
+
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    open_ = np.r_[close[0], close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.002, rows)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.002, rows)))
+
+    return pd.DataFrame({
+        "Date": pd.date_range("1678-01-01", periods = rows, freq = SYNTHETIC_INTERVAL),
+        "Open": open_, "High": high, "Low": low, "Close": close,
+        "Volume": rng.lognormal(3, 1, rows)
+    })
+
+# Returns the best time of every step of the pipeline on df, a data set compatible with
+# the data processor module, in seconds
+#
+# predict_point is timed per call; steps that loop over rows in Python are left out
+# for data sets larger than SLOW_MAX_ROWS
+#
+# The indicators are configured for the interval detected in df, as by read_data_from_df;
+# a data set with no rows left after the warm up cannot be benchmarked
+def benchmark_suite(df, model_file, repeat = 3):
+    results = {}
+    config = data_processor.indicator_config(interval = data_processor.data_interval(df))
+
+    if len(df) <= data_processor.warmup_rows(config):
+        raise BenchmarkException("Data set of {} rows has no rows after the warm up of {} rows".format(
+            len(df), data_processor.warmup_rows(config)))
+
+    df_raw = df.reset_index(drop = True)
+    df_raw = df_raw.assign(**indicators.generate_hlc(df_raw))
+
+    def with_raw():
+        return df_raw.copy()
+
+    results["generate_hlc"] = time_call(indicators.generate_hlc, with_raw, repeat)
+    results["generate_ema"] = time_call(lambda df: indicators.generate_ema(df, 30, config), with_raw, repeat)
+    results["generate_macd"] = time_call(lambda df: indicators.generate_macd(df, config), with_raw, repeat)
+    results["generate_obv"] = time_call(lambda df: indicators.generate_obv(df, config), with_raw, repeat)
+    results["generate_rsi"] = time_call(lambda df: indicators.generate_rsi(df, config = config), with_raw, repeat)
+    # The first call compiles the kernel when Numba is installed
+    indicators.generate_fused(df_raw.iloc[:100].copy(), config = config)
+    results["generate_fused"] = time_call(lambda df: indicators.generate_fused(df, config = config), with_raw, repeat)
+
+    prices = df_raw["HLCAverage"]
+    results["local_extremas"] = time_call(lambda _: extrema.local_extremas(prices, 20), repeat = repeat)
+    if len(df) <= SLOW_MAX_ROWS:
+        results["local_extrema (reference)"] = time_call(lambda _: extrema.local_extrema(prices, 20, np.less_equal), repeat = 1)
+
+    results["read_data_from_df"] = time_call(lambda df: data_processor.read_data_from_df(df, True), df.copy, repeat)
+
+    df_processed = data_processor.read_data_from_df(df.copy(), True, extrema_enabled = False, columns = train.FEATURE_COLUMNS)
+    Predict.preprocess_data(df_processed)
+    df_features = Predict.feature_attributes(df_processed)
+    predict = Predict(model_file, k_neighbors = 5, max_conflicts = 2, search_distance = 26)
+
+    results["predict_full"] = time_call(lambda df: predict.predict_full(df, df_features), df_processed.copy, repeat)
+    results["predict_walk_forward"] = time_call(lambda df: predict.predict_walk_forward(df, df_features), df_processed.copy, repeat)
+
+    df_predicted = df_processed.copy()
+    predict.predict_full(df_predicted, df_features, model_predict_only = True)
+    results["validate_extremas"] = time_call(lambda _: predict.validate_extremas(df_predicted), repeat = repeat)
+
+    points = np.linspace(0, len(df_processed) - 1, min(PREDICT_POINT_CALLS, len(df_processed))).astype(int)
+    def predict_points(_):
+        for index in points:
+            predict.predict_point(df_processed, df_features, index)
+    results["predict_point (per call)"] = time_call(predict_points, repeat = 1) / len(points)
+
+    predict.predict_full(df_predicted, df_features)
+    df_alternated = df_predicted.copy()
+    strategy.alternate_extremas(df_alternated)
+    df_ended = df_alternated.copy()
+    if (df_ended["Extrema"] != 0).any():
+        strategy.end_with_sell(df_ended)
+
+    results["alternate_extremas"] = time_call(strategy.alternate_extremas, df_predicted.copy, repeat)
+    results["end_with_sell"] = time_call(strategy.end_with_sell, df_alternated.copy, repeat)
+    results["generate_tx_summary"] = time_call(lambda _: strategy.generate_tx_summary(df_ended), repeat = repeat)
+    results["simulate"] = time_call(
+        lambda _: strategy.simulate(df_predicted["Extrema"].to_numpy(), df_predicted["HLCAverage"].to_numpy()), repeat = repeat
+    )
+
+    return results
+
+# Returns the results of benchmark_suite on every data set, keyed on the name of the data
+# set (the file name of bundled data sets, and "synthetic-<rows>" for synthetic ones)
+def run_suite(model_file, sizes = DEFAULT_SIZES, data_files = None, repeat = 3):
+    if data_files is None:
+        data_files = sorted(
+            os.path.join(data_processor.DATASET_DIR, file) for file in os.listdir(data_processor.DATASET_DIR) if file.endswith(".csv")
+        )
+
+    results = {}
+    for data_file in data_files:
+        df = data_processor.read_csv(data_file, skip_columns = data_processor.UNUSED_CSV_COLUMNS)
+        results[os.path.basename(data_file)] = benchmark_suite(df, model_file, repeat)
+
+    for rows in sizes:
+        # Single runs for the largest sizes, which take long enough to time reliably
+        results["synthetic-{}".format(rows)] = benchmark_suite(synthetic_ohlcv(rows), model_file, repeat if rows <= 1000000 else 1)
+
+    return results
+
+# Returns a dataframe of the time of every step (rows) on every synthetic data set
+# (columns, by number of rows), along with the scaling exponent of each step: the slope
+# of log time against log rows, where 1 is linear
+def scaling_table(results):
+    sizes = sorted(int(name.split("-")[1]) for name in results if name.startswith("synthetic-"))
+    df = pd.DataFrame({ rows: results["synthetic-{}".format(rows)] for rows in sizes })
+
+    def exponent(times):
+        known = times.dropna()
+        if len(known) < 2:
+            return np.nan
+        return np.polyfit(np.log(known.index.to_numpy(dtype = np.float64)), np.log(known.to_numpy()), 1)[0]
+
+    df["Scaling"] = df.apply(exponent, axis = 1)
+    return df
+
+# Save the scaling curves of every step to a PNG image
+def plot_scaling(results, file):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    df = scaling_table(results).drop(columns = "Scaling")
+
+    fig, ax = plt.subplots(figsize = (10, 6))
+    for name, times in df.iterrows():
+        ax.plot(times.index, times.to_numpy(), marker = "o", label = name)
+
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("Rows")
+    ax.set_ylabel("Seconds")
+    ax.legend(fontsize = "small", ncol = 2)
+    fig.savefig(file)
+    plt.close(fig)
+
+def save_results(results, file):
+    directory = os.path.dirname(file)
+    if directory:
+        os.makedirs(directory, exist_ok = True)
+
+    with open(file, "w") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "numba": indicators.FUSED_COMPILED,
+            "results": results
+        }, f, indent = 2)
+
+def load_results(file):
+    with open(file) as f:
+        return json.load(f)["results"]
+
+# Returns a dataframe of the time of every step on every data set in both results and
+# baseline, with the ratio of the two; ratios above REGRESSION_RATIO are regressions
+def compare_results(results, baseline):
+    rows = [
+        (data_set, name, baseline[data_set][name], elapsed, elapsed / baseline[data_set][name])
+        for data_set, steps in results.items() if data_set in baseline
+        for name, elapsed in steps.items() if name in baseline[data_set]
+    ]
+
+    df = pd.DataFrame(rows, columns = ["DataSet", "Step", "Baseline", "Current", "Ratio"])
+    df["Regression"] = df["Ratio"] > REGRESSION_RATIO
+    return df
+
+class BenchmarkException(Exception):
+    pass
+
+def main(args = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default = "models/model.joblib", help = "model file used for prediction")
+    parser.add_argument("--sizes", type = int, nargs = "*", default = DEFAULT_SIZES, help = "rows of the synthetic data sets")
+    parser.add_argument("--repeat", type = int, default = 3, help = "number of times each step is timed")
+    parser.add_argument("--save", help = "save the results to this JSON file")
+    parser.add_argument("--compare", help = "compare the results to those saved in this JSON file")
+    parser.add_argument("--plot", help = "save the scaling curves to this PNG file")
+    options = parser.parse_args(args)
+
+    model_file = options.model
+
+    # Same data and settings as backtest.py
+    data_file_path = "datasets/Coinbase_BTCUSD_1h.csv"
+    data_year_range = (2019,)
+
+    df = data_processor.read_data(data_file_path, data_year_range, True, extrema_enabled = False)
+    predict = Predict(
+        model_file,
+        k_neighbors = 5,
+        max_conflicts = 2,
+        search_distance = 26
+    )
+    Predict.preprocess_data(df)
+
+    print_results("Prediction merge, {} rows".format(len(df)), benchmark_merge(df, predict))
+
+    compiled_predict = Predict(
+        model_file,
+        k_neighbors = 5,
+        max_conflicts = 2,
+        search_distance = 26,
+        compiled_model = True
+    )
+    print_results("Model inference, {} rows".format(len(df)), benchmark_inference(df, predict, compiled_predict))
+
+    results = run_suite(model_file, options.sizes, repeat = options.repeat)
+    for data_set, steps in results.items():
+        print_results("Suite, {}".format(data_set), steps)
+
+    if options.sizes:
+        print("Scaling (seconds by rows)")
+        print(scaling_table(results).to_string())
+
+    if options.plot:
+        plot_scaling(results, options.plot)
+
+    if options.save:
+        save_results(results, options.save)
+
+    if options.compare:
+        df_compare = compare_results(results, load_results(options.compare))
+        print("Compared to", options.compare)
+        print(df_compare.to_string(index = False))
+
+        regressions = df_compare[df_compare["Regression"]]
+        if len(regressions) > 0:
+            print("Regressions:", ", ".join(regressions["DataSet"] + " " + regressions["Step"]))
+
+if __name__ == "__main__":
+    main()
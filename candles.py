@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+# Aggregation of OHLCV candles into candles of a longer interval, e.g. hourly candles into
+# daily candles, so that a single data set of the finest interval available can be
+# processed at any interval rather than keeping a data set for each
+#
+# Candles are grouped by the start of the interval they fall in, counted from midnight
+# (UTC for the bundled data sets), and are labelled by it:
+#
+# Open   = first
+# High   = maximum
+# Low    = minimum
+# Close  = last
+# Volume = sum, as well as the volume in the quote currency (e.g. Volume USD)
+#
+# Any other column (e.g. Symbol) takes the first value. Intervals without any candles
+# are left out rather than filled in
+#
+# Sample flow / code:
+#
+# df_daily = resample(df_hourly, "1D")
+# timeframes = resample_many(df_hourly, ["4h", "1D", "7D"])
+# aggregator = CandleAggregator("1D")
+# completed = aggregator.update( ... newly received hourly candle ... )
+
+# Returns the candles of df aggregated into candles of interval, in date ascending order
+#
+# interval is anything accepted by pd.Timedelta, e.g. "4h" or "1D"
+def resample(df, interval):
+    if not df["Date"].is_monotonic_increasing:
+        df = df.sort_values("Date", kind = "stable")
+
+    if len(df) == 0:
+        return df.reset_index(drop = True)
+
+    bins = df["Date"].dt.floor(pd.Timedelta(interval)).to_numpy()
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], len(bins)] - 1
+
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        rule = _aggregation(column)
+
+        if column == "Date":
+            columns[column] = bins[starts]
+        elif rule == "max":
+            columns[column] = np.fmax.reduceat(values.astype(np.float64), starts)
+        elif rule == "min":
+            columns[column] = np.fmin.reduceat(values.astype(np.float64), starts)
+        elif rule == "sum":
+            columns[column] = np.add.reduceat(np.nan_to_num(values.astype(np.float64)), starts)
+        elif rule == "last":
+            columns[column] = values[ends]
+        else:
+            columns[column] = values[starts]
+
+    return pd.DataFrame(columns, columns = df.columns)
+
+# Returns a dict of the candles of df aggregated into each of intervals
+#
+# Every interval is aggregated from the longest interval already aggregated that evenly
+# divides it (e.g. daily candles from 4 hour candles), rather than from df each time
+def resample_many(df, intervals):
+    resampled = {}
+
+    for interval in sorted(intervals, key = pd.Timedelta):
+        divisors = [other for other in resampled if pd.Timedelta(interval) % pd.Timedelta(other) == pd.Timedelta(0)]
+        source = resampled[max(divisors, key = pd.Timedelta)] if divisors else df
+
+        resampled[interval] = resample(source, interval)
+
+    return { interval: resampled[interval] for interval in intervals }
+
+# Returns how a column is aggregated
+def _aggregation(column):
+    if column == "High":
+        return "max"
+    elif column == "Low":
+        return "min"
+    elif column == "Close":
+        return "last"
+    elif column == "Volume" or column.startswith("Volume "):
+        return "sum"
+    return "first"
+
+# CandleAggregator aggregates candles received one at a time, e.g. from a live feed, into
+# candles of a longer interval with the same values as resample
+#
+# Only the candle of the current interval is kept; it is completed once a candle of a
+# later interval is received
+class CandleAggregator:
+    def __init__(self, interval):
+        self._interval = pd.Timedelta(interval)
+        self._candle = None
+
+    # Adds a candle, a dict (or row) with a Date and any of the aggregated columns
+    #
+    # Returns the completed candle of the previous interval as a dict if candle starts a
+    # new interval, otherwise None; candles of an interval before the current one are
+    # too late to be aggregated and are ignored
+    def update(self, candle):
+        start = pd.Timestamp(candle["Date"]).floor(self._interval)
+
+        if self._candle is not None and start < self._candle["Date"]:
+            return None
+
+        if self._candle is None or start > self._candle["Date"]:
+            completed = self._candle
+            self._candle = { column: value for column, value in candle.items() }
+            self._candle["Date"] = start
+
+            for column, value in self._candle.items():
+                if _aggregation(column) == "sum" and pd.isna(value):
+                    self._candle[column] = 0.0
+
+            return completed
+
+        for column, value in candle.items():
+            rule = _aggregation(column)
+
+            if column == "Date" or rule == "first":
+                continue
+            elif rule == "max":
+                self._candle[column] = np.fmax(self._candle[column], value)
+            elif rule == "min":
+                self._candle[column] = np.fmin(self._candle[column], value)
+            elif rule == "sum":
+                self._candle[column] += 0.0 if pd.isna(value) else value
+            else:
+                self._candle[column] = value
+
+        return None
+
+    # Returns the candle of the current interval as a dict, which may still change, or
+    # None before any candle is received
+    def get_current(self):
+        return dict(self._candle) if self._candle is not None else None
+
+    # Returns the candle of the current interval as completed, e.g. once the interval
+    # has ended without a later candle being received, and starts over
+    def flush(self):
+        completed, self._candle = self._candle, None
+        return completed
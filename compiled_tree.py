@@ -0,0 +1,137 @@
+import numpy as np
+
+# CompiledTree holds a trained sklearn DecisionTreeClassifier as flat NumPy arrays of its
+# nodes, so predictions are made by walking the arrays directly rather than going through
+# the validation sklearn does on every call
+#
+# Predictions are identical to the model's: features are compared as float32 against
+# the node thresholds, the same precision sklearn uses, and each leaf predicts the class
+# with the largest value as in DecisionTreeClassifier.predict
+#
+# Sample flow / code:
+#
+# tree = CompiledTree.from_model(load("models/model.joblib"))
+# extremas = tree.predict(df_features.to_numpy())
+# extrema = tree.predict_one([hlc_average, rsi, ema_cross_difference, ... ])
+
+class CompiledTree:
+    # Child of the leaf nodes in left and right, same as sklearn's TREE_LEAF
+    LEAF = -1
+
+    # feature, threshold, left and right are the feature index, threshold and child nodes
+    # of each node, missing_left is whether missing (NaN) values go to the left child,
+    # and leaf_classes is the predicted class of each node
+    def __init__(self, feature, threshold, left, right, missing_left, leaf_classes):
+        self._feature = feature
+        self._threshold = threshold
+        self._left = left
+        self._right = right
+        self._missing_left = missing_left
+        self._leaf_classes = leaf_classes
+
+        # Python lists are faster to index one node at a time than NumPy arrays
+        self._nodes = list(zip(feature.tolist(), threshold.tolist(), left.tolist(), right.tolist(), missing_left.tolist()))
+        self._leaf_list = leaf_classes.tolist()
+
+    @staticmethod
+    def from_model(dtree):
+        tree = dtree.tree_
+        if tree.n_outputs != 1:
+            raise CompiledTreeException("Only models with a single output can be compiled")
+
+        # Models from versions of sklearn without missing value support never have NaN
+        # features to route
+        missing_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype = np.uint8))
+
+        return CompiledTree(
+            tree.feature.astype(np.intp), tree.threshold.astype(np.float64),
+            tree.children_left.astype(np.intp), tree.children_right.astype(np.intp),
+            np.asarray(missing_left, dtype = bool),
+            dtree.classes_.take(np.argmax(tree.value[:, 0, :], axis = 1))
+        )
+
+    # Save the node arrays to file as a NumPy .npz archive, which can be loaded without
+    # sklearn
+    def save(self, file):
+        np.savez(
+            file, feature = self._feature, threshold = self._threshold, left = self._left, right = self._right,
+            missing_left = self._missing_left, leaf_classes = self._leaf_classes
+        )
+
+    @staticmethod
+    def load(file):
+        with np.load(file) as arrays:
+            return CompiledTree(
+                arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"],
+                arrays["missing_left"], arrays["leaf_classes"]
+            )
+
+    # Returns the predicted class of every row of a two dimensional array of features
+    #
+    # Each row is walked down the tree in a loop compiled with Numba when it is installed
+    # (see WALK_COMPILED); otherwise all rows move down one level of the tree at a time
+    # with NumPy, until every row is at a leaf
+    def predict(self, features):
+        features = np.ascontiguousarray(features, dtype = np.float32)
+        nodes = np.zeros(len(features), dtype = np.intp)
+
+        if WALK_COMPILED:
+            _walk_kernel(features, self._feature, self._threshold, self._left, self._right, self._missing_left, nodes)
+            return self._leaf_classes[nodes]
+
+        rows = np.arange(len(features))
+        while len(rows) > 0:
+            current = nodes[rows]
+            internal = self._left[current] != CompiledTree.LEAF
+            rows, current = rows[internal], current[internal]
+
+            values = features[rows, self._feature[current]]
+            go_left = (values <= self._threshold[current]) | (np.isnan(values) & self._missing_left[current])
+            nodes[rows] = np.where(go_left, self._left[current], self._right[current])
+
+        return self._leaf_classes[nodes]
+
+    # Returns the predicted class of a single row of features, e.g. the latest row of live
+    # data, walking the nodes one at a time as plain Python values
+    def predict_one(self, features):
+        values = np.asarray(features, dtype = np.float32).tolist()
+        nodes = self._nodes
+
+        node = 0
+        feature, threshold, left, right, missing_left = nodes[node]
+        while left != CompiledTree.LEAF:
+            value = values[feature]
+            # NaN fails every comparison
+            if value <= threshold or (missing_left and value != value):
+                node = left
+            else:
+                node = right
+            feature, threshold, left, right, missing_left = nodes[node]
+
+        return self._leaf_list[node]
+
+class CompiledTreeException(Exception):
+    pass
+
+# Stores the leaf node reached by each row of features in out_nodes
+def _walk_loop(features, feature, threshold, left, right, missing_left, out_nodes):
+    for i in range(features.shape[0]):
+        node = 0
+        while left[node] != -1:
+            value = features[i, feature[node]]
+            if value <= threshold[node] or (missing_left[node] and np.isnan(value)):
+                node = left[node]
+            else:
+                node = right[node]
+
+        out_nodes[i] = node
+
+# Numba is optional; predict uses NumPy operations over all rows without it
+try:
+    from numba import njit
+
+    _walk_kernel = njit(cache = True)(_walk_loop)
+    WALK_COMPILED = True
+except ImportError:
+    _walk_kernel = _walk_loop
+    WALK_COMPILED = False
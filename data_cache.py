@@ -0,0 +1,81 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Cache of dataframes derived from a data set file, stored as one NumPy .npy file per
+# column so that later runs can memory map the columns instead of parsing the data set
+#
+# Entries are keyed on the data set file's path, modification time and size along with
+# the parameters used to derive the dataframe, so changing the file or the parameters
+# never returns stale data
+
+# Bump when the way cached dataframes are stored changes to invalidate older entries;
+# changes to how they are derived are covered by their params (e.g.
+# data_processor.PROCESSING_VERSION)
+CACHE_VERSION = 1
+
+META_FILE = "meta.json"
+
+# Returns the cached dataframe derived from data_file_path with the given parameters, or
+# calls create to derive it and stores the result before returning it
+#
+# params must be representable as JSON
+def load_or_create(cache_dir, data_file_path, params, create):
+    entry_dir = os.path.join(cache_dir, cache_key(data_file_path, params))
+
+    if os.path.isfile(os.path.join(entry_dir, META_FILE)):
+        return load_frame(entry_dir)
+
+    df = create()
+    save_frame(df, entry_dir)
+    return df
+
+def cache_key(data_file_path, params):
+    stat = os.stat(data_file_path)
+    key = json.dumps([CACHE_VERSION, os.path.realpath(data_file_path), stat.st_mtime_ns, stat.st_size, params])
+
+    name = os.path.splitext(os.path.basename(data_file_path))[0]
+    return name + "-" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+# Columns are memory mapped copy-on-write: they are only read from disk when accessed and
+# can be modified in memory without changing the cache
+def load_frame(entry_dir):
+    with open(os.path.join(entry_dir, META_FILE)) as f:
+        columns = json.load(f)["columns"]
+
+    return pd.DataFrame({
+        column: np.load(os.path.join(entry_dir, "{}.npy".format(i)), mmap_mode = "c")
+        for i, column in enumerate(columns)
+    }, copy = False)
+
+# The entry is written to a temporary directory first and then moved into place, so a
+# partially written entry is never loaded
+def save_frame(df, entry_dir):
+    cache_dir = os.path.dirname(entry_dir)
+    os.makedirs(cache_dir, exist_ok = True)
+    temp_dir = tempfile.mkdtemp(dir = cache_dir)
+
+    try:
+        for i, column in enumerate(df.columns):
+            values = df[column].to_numpy()
+            if values.dtype == object:
+                # Object arrays cannot be memory mapped; fixed width strings can
+                values = values.astype(str)
+
+            np.save(os.path.join(temp_dir, "{}.npy".format(i)), values)
+
+        with open(os.path.join(temp_dir, META_FILE), "w") as f:
+            json.dump({ "columns": list(df.columns) }, f)
+
+        os.replace(temp_dir, entry_dir)
+    except OSError:
+        # Another process may have stored the same entry in the meantime
+        if not os.path.isfile(os.path.join(entry_dir, META_FILE)):
+            raise
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors = True)
@@ -7,41 +7,50 @@ def plot_price(df, viz):
 
     def price_callback(ax):
         # HLCAverage as price, EMA 30
-        ax.plot(df["Date"], df["HLCAverage"])
-        ax.plot(df["Date"], df["EMA30"])
+        # Extremas are kept on the decimated price line
+        viz.plot_line(ax, df["Date"], df["HLCAverage"], keep = df["Extrema"] != 0)
+        viz.plot_line(ax, df["Date"], df["EMA30"])
 
         # Price Extrema
-        ax.scatter(minima["Date"], minima["HLCAverage"], c = "g")
-        ax.scatter(maxima["Date"], maxima["HLCAverage"], c = "r")
+        viz.plot_points(ax, minima["Date"], minima["HLCAverage"], "g")
+        viz.plot_points(ax, maxima["Date"], maxima["HLCAverage"], "r")
 
     viz.fill_next_axis(price_callback, "Price", ["HLC Average", "EMA30", "Minima", "Maxima"])
 
 def plot_macd(df, viz):
     def macd_callback(ax):
-        ax.plot(df["Date"], df["MACD"])
-        ax.plot(df["Date"], df["MACDSignal"])
+        viz.plot_line(ax, df["Date"], df["MACD"])
+        viz.plot_line(ax, df["Date"], df["MACDSignal"])
 
     viz.fill_next_axis(macd_callback, "Moving Average Convergence Divergence", ["MACD", "Signal"])
 
 def plot_obv(df, viz):
     def obv_callback(ax):
-        ax.plot(df["Date"], df["OBV"])
+        viz.plot_line(ax, df["Date"], df["OBV"])
 
     viz.fill_next_axis(obv_callback, "On-Balance Volume", ["OBV"])
 
 def plot_rsi(df, viz):
     def rsi_callback(ax):
-        ax.plot(df["Date"], df["RSI"])
+        viz.plot_line(ax, df["Date"], df["RSI"])
 
     viz.fill_next_axis(rsi_callback, "Relative Strength Indicator", ["RSI"])
 
-def main():
-    df = data_processor.main()
-    viz = Visualizer("Indicator Movement on Condensed Range Data", 4, [3, 1, 1, 1])
+# Show the processed data, or save it to output_file (e.g. a PNG) without a display
+def visualize_data(df, output_file = None):
+    viz = Visualizer("Indicator Movement on Condensed Range Data", 4, [3, 1, 1, 1], headless = output_file is not None)
 
     [plot(df, viz) for plot in (plot_price, plot_macd, plot_obv, plot_rsi)]
     viz.show_last_x_axis_only()
-    viz.show()
+
+    if output_file is not None:
+        viz.save(output_file)
+    else:
+        viz.show()
+
+def main():
+    df = data_processor.main()
+    visualize_data(df)
 
 if __name__ == "__main__":
     main()
@@ -1,114 +1,663 @@
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import io
+import os
+
 import numpy as np
 import pandas as pd
 
+import candles
+import data_cache
 import extrema
 import indicators
+import profiler
+
+# Default directory used by the sample flows to cache parsed and processed data sets
+CACHE_DIR = ".cache"
+
+# Directory of the bundled data sets
+DATASET_DIR = "datasets"
+
+# Columns of the data sets that are never used by processing and are not loaded
+UNUSED_CSV_COLUMNS = ["Symbol", "Open"]
+
+# Processed columns that only hold a direction, i.e. -1, 1 or NaN
+DIRECTION_COLUMNS = ["EMACrossDirection", "MACDCrossDirection", "Extrema"]
+
+# Number of days of entries removed from the start of the processed data, as the
+# calculated technical indicators are less accurate until then
+WARMUP_DAYS = 30
+
+# Version of the processed data, part of the key of processed data sets in the cache
+#
+# Bump whenever a change to processing (here or in indicators, extrema or candles) gives
+# different processed data for the same data set and parameters, so that dataframes
+# cached by earlier versions are not returned
+PROCESSING_VERSION = 2
 
 # Read data from CSV before processing
 #
 # This is the one that is generally called for training and backtest prediction
 # purposes
+#
+# The data can be limited to whole years with data_year_range, or to any range of time
+# with start_time and/or end_time; only the rows within the range are loaded from the
+# data set. With start_time, the rows needed to warm up the indicators (which are removed
+# after processing) are loaded in addition, so that the processed data starts at
+# start_time
+#
+# When cache_dir is given, the parsed data set and the processed dataframe are cached
+# there so that later calls with the same file and parameters skip parsing and processing
+#
+# The interval between rows (e.g. hourly or minute data) is detected from the dates of
+# the data set unless data_hourly is given, see detect_interval
+#
+# Only the indicator columns in columns are generated, and the condensed data is scaled
+# by normalization, see read_data_from_df
+#
+# With interval (e.g. "4h" or "1D"), the candles of the data set are aggregated into
+# candles of that interval before processing (see candles.resample), e.g. to process the
+# hourly data set as daily data
 def read_data(data_file_path,
-        data_year_range = None, data_condensed = False, data_hourly = False,
-        extrema_n = 20, extrema_enabled = True):
-    # Data frame
-    df = pd.read_csv(
-        data_file_path,
-        header = 1,
-        parse_dates = ["Date"],
-        date_parser = lambda x : pd.datetime.strptime(x, "%Y-%m-%d" + (" %I-%p" if data_hourly else ""))
-    )
-    df.rename(columns = { "Volume BTC": "Volume" }, inplace = True) # Rename the asset volume column to just Volume
+        data_year_range = None, data_condensed = False, data_hourly = None,
+        extrema_n = 20, extrema_enabled = True, cache_dir = None,
+        start_time = None, end_time = None, fused_indicators = False, data_compact = False,
+        columns = None, normalization = "global", normalization_window = None, interval = None):
+    warmup_days = WARMUP_DAYS if start_time is not None else 0
 
     if data_year_range:
-        start_time = pd.datetime(year = min(data_year_range), month = 1, day = 1)
-        end_time = pd.datetime(year = max(data_year_range), month = 12, day = 31)
-        df = df[(df.Date >= start_time) & (df.Date <= end_time)]
+        start_time = pd.Timestamp(year = min(data_year_range), month = 1, day = 1)
+        end_time = pd.Timestamp(year = max(data_year_range), month = 12, day = 31)
+
+    start_time = pd.Timestamp(start_time) if start_time is not None else None
+    end_time = pd.Timestamp(end_time) if end_time is not None else None
+
+    def process():
+        with profiler.stage("parse") as parse_stage:
+            if cache_dir is None:
+                df = read_csv_range(data_file_path, start_time, end_time, warmup_days, data_hourly, skip_columns = UNUSED_CSV_COLUMNS)
+            else:
+                df = select_range(read_csv(data_file_path, cache_dir, UNUSED_CSV_COLUMNS), start_time, end_time, warmup_days, data_hourly)
+
+            parse_stage.set_rows(len(df))
+
+        if interval is not None:
+            with profiler.stage("resample", len(df)):
+                df = candles.resample(df, interval)
+
+        return read_data_from_df(df, data_condensed, data_hourly, extrema_n, extrema_enabled, fused_indicators, data_compact,
+            columns, normalization, normalization_window, interval)
+
+    if cache_dir is None:
+        with profiler.stage("read_data"):
+            return process()
+
+    params = [
+        "read_data", PROCESSING_VERSION, data_year_range, data_condensed, data_hourly, extrema_n, extrema_enabled,
+        str(start_time), str(end_time), warmup_days, fused_indicators, data_compact,
+        sorted(columns) if columns is not None else None, normalization, normalization_window,
+        str(pd.Timedelta(interval)) if interval is not None else None
+    ]
+    with profiler.stage("read_data"):
+        return data_cache.load_or_create(cache_dir, data_file_path, params, process)
+
+# Read the rows of the data set within [start_time, end_time] from CSV, along with up to
+# warmup_days worth of rows before start_time, in date ascending order
+#
+# The data set is expected to be in date descending order: the start of the range is
+# found by binary search over the file, and reading stops as soon as the warm up rows
+# before start_time have been read, so rows outside of the range are never parsed
+#
+# Columns in skip_columns are not loaded
+def read_csv_range(data_file_path, start_time = None, end_time = None, warmup_days = 0, data_hourly = None,
+        chunk_size = 10000, skip_columns = ()):
+    chunks = []
+
+    with open(data_file_path, "rb") as f:
+        f.readline() # Line before the header
+        columns = pd.read_csv(io.BytesIO(f.readline())).columns
+        data_start = f.tell()
+
+        if end_time is not None:
+            f.seek(_seek_date(f, data_start, end_time))
+
+        options = dict(
+            header = None, names = columns, dtype = { "Date": str },
+            usecols = [column for column in columns if column not in skip_columns]
+        )
+        reader = pd.read_csv(f, chunksize = chunk_size, **options)
+        warmup_rows = None
+        # Number of warm up rows left to read once a row before start_time has been read
+        remaining_rows = None
+
+        for chunk in reader:
+            chunk["Date"] = parse_dates(chunk["Date"])
+
+            if warmup_rows is None:
+                warmup_rows = _days_to_rows(warmup_days, chunk, data_hourly)
+
+            if end_time is not None:
+                chunk = chunk[chunk["Date"] <= end_time]
+
+            if remaining_rows is None:
+                before_start = (chunk["Date"] < start_time).to_numpy() if start_time is not None else []
+                if not np.any(before_start):
+                    chunks.append(chunk)
+                    continue
+
+                # Rows from here on are before the range; only warm up rows are kept, as long
+                # as there are any rows within the range to warm up for
+                first_before = np.argmax(before_start)
+                chunks.append(chunk.iloc[:first_before])
+                if sum(len(c) for c in chunks) == 0:
+                    break
+
+                chunk = chunk.iloc[first_before:]
+                remaining_rows = warmup_rows
+
+            chunks.append(chunk.iloc[:remaining_rows])
+            remaining_rows -= min(remaining_rows, len(chunk))
+            if remaining_rows == 0:
+                break
+
+        if sum(len(chunk) for chunk in chunks) == 0:
+            # No rows are in the range (e.g. it is before the first row), and columns of empty
+            # chunks have no dtype; the first row of the data set gives them the same dtypes
+            # as when rows are read
+            f.seek(data_start)
+            first = pd.read_csv(f, nrows = 1, **options)
+            first["Date"] = parse_dates(first["Date"])
+            chunks = [first.iloc[:0]]
+
+    df = pd.concat(chunks)
+    rename_volume(df)
 
     # Reverse the data set as it is loaded in date descending order, we want ascending
     df = df.iloc[::-1]
+    df.reset_index(drop = True, inplace = True)
+    return df
+
+# Rename the volume column of the asset itself (e.g. Volume BTC for BTCUSD) to just Volume
+#
+# Data sets list the volume in the asset before the volume in the quote currency
+def rename_volume(df):
+    volume_columns = [column for column in df.columns if column.startswith("Volume ")]
+    if volume_columns and "Volume" not in df.columns:
+        df.rename(columns = { volume_columns[0]: "Volume" }, inplace = True)
+
+# Returns the path of the bundled data set of an asset by its symbol, e.g. BTCUSD
+def dataset_path(symbol, data_hourly = True, exchange = "Coinbase"):
+    return os.path.join(DATASET_DIR, "{}_{}_{}.csv".format(exchange, symbol, "1h" if data_hourly else "d"))
+
+# Read and process many data sets at once, spread across a pool of processes
+#
+# datasets is a list of data set file paths, or of dicts with a "data_file_path" along
+# with any other read_data parameters specific to that data set; parameters that are not
+# given by a data set are taken from the keyword arguments
+#
+# Returns a list of the processed dataframe of each data set, in the order of datasets
+#
+# With use_threads, a pool of threads is used instead, which avoids copying the processed
+# dataframes between processes at the cost of sharing the global interpreter lock
+def read_data_batch(datasets, processes = None, use_threads = False, **kwargs):
+    jobs = []
+    for dataset in datasets:
+        job = dict(kwargs)
+        job.update(dataset if isinstance(dataset, dict) else { "data_file_path": dataset })
+        jobs.append(job)
+
+    with (ThreadPool if use_threads else Pool)(processes) as pool:
+        return pool.map(_read_data_job, jobs)
+
+def _read_data_job(job):
+    return read_data(**job)
+
+# Select the rows within [start_time, end_time] of a data set in date ascending order (as
+# returned by read_csv), along with up to warmup_days worth of rows before start_time
+def select_range(df, start_time = None, end_time = None, warmup_days = 0, data_hourly = None):
+    in_range = np.ones(len(df), dtype = bool)
+    if start_time is not None:
+        in_range &= (df["Date"] >= start_time).to_numpy()
+    if end_time is not None:
+        in_range &= (df["Date"] <= end_time).to_numpy()
+
+    if warmup_days > 0 and np.any(in_range):
+        first = np.argmax(in_range)
+        in_range[max(first - _days_to_rows(warmup_days, df, data_hourly), 0):first] = True
+
+    return df[in_range]
+
+# Read and parse the entire data set from CSV, in date ascending order
+#
+# When cache_dir is given, the parsed data set is cached there so that later calls
+# with the same file skip parsing
+#
+# Columns in skip_columns are not loaded
+def read_csv(data_file_path, cache_dir = None, skip_columns = ()):
+    def parse():
+        # Data frame
+        df = pd.read_csv(data_file_path, header = 1, dtype = { "Date": str }, usecols = lambda column: column not in skip_columns)
+        df["Date"] = parse_dates(df["Date"])
+        rename_volume(df)
+
+        # Reverse the data set as it is loaded in date descending order, we want ascending
+        df = df.iloc[::-1]
+        df.reset_index(drop = True, inplace = True)
+        return df
+
+    if cache_dir is None:
+        return parse()
+
+    return data_cache.load_or_create(cache_dir, data_file_path, ["read_csv", list(skip_columns)], parse)
+
+# Convert a column of date strings into datetimes
+#
+# Daily ("%Y-%m-%d") and hourly ("%Y-%m-%d %I-%p") dates are decoded by slicing their
+# fixed width fields out of the raw bytes of the whole column at once; any other format
+# is left to pandas
+def parse_dates(dates):
+    raw = np.asarray(dates, dtype = object).astype(bytes)
+    width = raw.dtype.itemsize
+    if len(raw) == 0 or width not in (10, 16):
+        return pd.to_datetime(dates)
+
+    chars = raw.view(np.uint8).reshape(len(raw), width)
+    hourly = width == 16
+
+    layout = (chars[:, 4] == ord("-")) & (chars[:, 7] == ord("-"))
+    if hourly:
+        layout &= (chars[:, 10] == ord(" ")) & (chars[:, 13] == ord("-")) & np.isin(chars[:, 14], [ord("A"), ord("P")]) & (chars[:, 15] == ord("M"))
+    if not np.all(layout):
+        return pd.to_datetime(dates)
+
+    digit_positions = [0, 1, 2, 3, 5, 6, 8, 9] + ([11, 12] if hourly else [])
+    digits = chars.astype(np.int64) - ord("0")
+
+    def field(start, end):
+        value = np.zeros(len(raw), dtype = np.int64)
+        for i in range(start, end):
+            value = value * 10 + digits[:, i]
+        return value
+
+    year, month, day = field(0, 4), field(5, 7), field(8, 10)
+    hour = field(11, 13) if hourly else np.zeros(len(raw), dtype = np.int64)
+
+    months = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    days_in_month = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+
+    valid = (
+        np.all((digits[:, digit_positions] >= 0) & (digits[:, digit_positions] <= 9), axis = 1)
+        & (month >= 1) & (month <= 12) & (day >= 1) & (day <= days_in_month)
+        & ((hour >= 1) & (hour <= 12) if hourly else True)
+    )
+    if not np.all(valid):
+        # Let pandas report the dates that are not valid
+        return pd.to_datetime(dates, format = "%Y-%m-%d" + (" %I-%p" if hourly else ""))
 
-    return read_data_from_df(df, data_condensed, data_hourly, extrema_n, extrema_enabled)
+    if hourly:
+        # 12 AM is the start of the day and 12 PM is noon
+        hour = hour % 12 + np.where(chars[:, 14] == ord("P"), 12, 0)
+
+    parsed = months.astype("datetime64[D]") + (day - 1) + hour.astype("timedelta64[h]")
+    return pd.Series(parsed.astype("datetime64[ns]"), index = dates.index if isinstance(dates, pd.Series) else None, name = "Date")
+
+# Returns the interval between the rows of df (e.g. an hour for hourly data, or a minute
+# for minute data) as the median time between consecutive rows in either date order, so
+# that gaps in the data do not change it, or None if it has less than two rows
+def detect_interval(df):
+    interval = df["Date"].diff().abs().median() if len(df) > 1 else pd.NaT
+    return None if pd.isnull(interval) or interval <= pd.Timedelta(0) else interval
+
+# Returns the interval between the rows of df, given by data_hourly or otherwise detected
+# from its dates; data that has less than two rows is taken to be daily
+def data_interval(df, data_hourly = None):
+    if data_hourly is not None:
+        return pd.Timedelta(hours = 1) if data_hourly else pd.Timedelta(days = 1)
+
+    interval = detect_interval(df)
+    return interval if interval is not None else pd.Timedelta(days = 1)
+
+# Number of rows of df covering the given number of days, rounded up
+def _days_to_rows(days, df, data_hourly = None):
+    return int(np.ceil(days * (pd.Timedelta(days = 1) / data_interval(df, data_hourly))))
+
+# Returns the offset of the first line at or after offset in the data set file f
+def _line_start(f, data_start, offset):
+    if offset <= data_start:
+        return data_start
+
+    f.seek(offset - 1)
+    f.readline()
+    return f.tell()
+
+# Returns the offset of the first line in the date descending data set file f with a
+# date at or before time, by binary search over the offsets of the file
+def _seek_date(f, data_start, time):
+    low, high = data_start, f.seek(0, io.SEEK_END)
+
+    while low < high:
+        middle = (low + high) // 2
+
+        f.seek(_line_start(f, data_start, middle))
+        line = f.readline()
+        if not line.strip() or parse_dates([line.split(b",", 1)[0].decode()]).iloc[0] <= time:
+            high = middle
+        else:
+            low = middle + 1
+
+    return _line_start(f, data_start, low)
 
 # Process data straight a from pandas dataframe
 #
 # Should be directly called when using data that has been pre-processed into a 
 # compatible dataframe that the indicator data should be generated on
-def read_data_from_df(df, data_condensed = False, data_hourly = False,
-        extrema_n = 20, extrema_enabled = True):
-    # Reset index as correct index is depended on by generate_obv
+#
+# The indicator periods are scaled to the interval between rows, which is detected from
+# the dates in df (see detect_interval) unless data_hourly or interval (e.g. "4h") is
+# given
+#
+# Only the indicator columns in columns (see IndicatorFrame.COLUMNS), and the ones they
+# depend on, are generated; all of them are by default. Extrema is always included
+#
+# With fused_indicators, the indicators are generated in a single pass by
+# indicators.generate_fused when more than one of them is needed, which is faster when
+# Numba is installed
+#
+# With data_compact, the returned dataframe uses less memory (see compact)
+#
+# With data_condensed, normalization and normalization_window select how the indicators
+# are scaled (see condense); the expanding and rolling normalizations do not let any row
+# depend on later rows
+def read_data_from_df(df, data_condensed = False, data_hourly = None,
+        extrema_n = 20, extrema_enabled = True, fused_indicators = False, data_compact = False,
+        columns = None, normalization = "global", normalization_window = None, interval = None):
+    with profiler.stage("read_data_from_df", len(df)):
+        frame = IndicatorFrame(df, data_condensed, data_hourly, extrema_n, extrema_enabled, fused_indicators,
+            normalization, normalization_window, interval)
+        df = frame.get_df(columns)
+
+        if data_compact:
+            with profiler.stage("compact", len(df)):
+                df = compact(df)
+
+    return df
+
+# IndicatorFrame generates the indicator columns of a data set lazily: a column is only
+# computed when it is requested, either directly or by a column that depends on it, and
+# is kept for later requests
+#
+# Processed columns have the first WARMUP_DAYS removed and are condensed, crossed and
+# labelled the same way as by condense and generate_extremas on a whole dataframe
+#
+# Sample flow / code:
+#
+# frame = IndicatorFrame(df, data_condensed = True)
+# rsi = frame.get_column("RSI") # Only HLCAverage and RSI are computed
+# df_features = frame.get_df(train.FEATURE_COLUMNS)
+class IndicatorFrame:
+    # Indicator columns in the order they are added to processed dataframes
+    COLUMNS = [
+        "HLCAverage", "EMA30", "MACD", "MACDSignal", "OBV", "RSI",
+        "EMACrossDifference", "EMACrossDirection", "MACDCrossDifference", "MACDCrossDirection", "Extrema"
+    ]
+
+    # Columns each indicator column is generated from
+    DEPENDENCIES = {
+        "HLCAverage": [],
+        "EMA30": ["HLCAverage"],
+        "MACD": ["HLCAverage"],
+        "MACDSignal": ["MACD"],
+        "OBV": ["HLCAverage"],
+        "RSI": ["HLCAverage"],
+        "EMACrossDifference": ["HLCAverage", "EMA30"],
+        "EMACrossDirection": ["HLCAverage", "EMA30"],
+        "MACDCrossDifference": ["MACD", "MACDSignal"],
+        "MACDCrossDirection": ["MACD", "MACDSignal"],
+        "Extrema": ["HLCAverage"]
+    }
+
+    # Columns generated together by indicators.generate_fused, grouped by the generate_
+    # function producing them otherwise
+    FUSED_GROUPS = [["EMA30"], ["MACD", "MACDSignal"], ["OBV"], ["RSI"]]
+
+    # Columns of the data set that are replaced by the indicators
+    PRICE_COLUMNS = ["Symbol", "Open", "High", "Low", "Close"]
+
+    def __init__(self, df, data_condensed = False, data_hourly = None,
+            extrema_n = 20, extrema_enabled = True, fused_indicators = False,
+            normalization = "global", normalization_window = None, interval = None):
+        if normalization not in indicators.NORMALIZATIONS or (normalization == "rolling" and normalization_window is None):
+            raise IndicatorFrameException("Specify a normalization of indicators.NORMALIZATIONS, with a window if rolling")
+
+        if data_hourly is None and interval is None:
+            interval = data_interval(df)
+
+        # Indicators are generated on a copy with a fresh index, as generate_obv depends on
+        # the index being in order; the copy is in the case that df is reversed or was
+        # custom pre-processed
+        self._raw = df.reset_index(drop = True)
+        self._config = indicator_config(data_hourly, interval)
+        self._data_condensed = data_condensed
+        self._extrema_n = extrema_n
+        self._extrema_enabled = extrema_enabled
+        self._fused_indicators = fused_indicators
+        self._normalization = normalization
+        self._normalization_window = normalization_window
+
+        self._warmup_rows = warmup_rows(self._config)
+        self._columns = {}
+
+    # Returns the given columns and all of the columns they depend on, in the order of
+    # COLUMNS
+    @staticmethod
+    def required_columns(columns):
+        required = set()
+        pending = list(columns)
+
+        while pending:
+            column = pending.pop()
+            if column not in IndicatorFrame.DEPENDENCIES:
+                raise IndicatorFrameException("Unknown indicator column: " + column)
+
+            if column not in required:
+                required.add(column)
+                pending += IndicatorFrame.DEPENDENCIES[column]
+
+        return [column for column in IndicatorFrame.COLUMNS if column in required]
+
+    # Returns the processed values of an indicator column
+    def get_column(self, column):
+        if column not in IndicatorFrame.DEPENDENCIES:
+            raise IndicatorFrameException("Unknown indicator column: " + column)
+
+        if column not in self._columns:
+            # Dependencies are generated first so that each is profiled as its own stage
+            for dependency in IndicatorFrame.DEPENDENCIES[column]:
+                self.get_column(dependency)
+
+            with profiler.stage(column, len(self._raw)):
+                self._generate(column)
+
+        return self._columns[column]
+
+    # Returns the processed dataframe with the data set's own columns that are not
+    # replaced by the indicators (e.g. Date and Volume) followed by the given indicator
+    # columns, or all of them by default, along with Extrema
     #
-    # This is done in the case that the indicies are not in the correct order, either by the
-    # df passed in because of custom pre-processing, or because of df being reversed in
-    # read_data
-    df.reset_index(drop = True, inplace = True)
-    
-    indicators.generate_hlc(df)
-    indicators.price_field = "HLCAverage"
-    if data_hourly:
-        indicators.time_multiplier = 24
-
-    # Drop unused columns
-    unused = ["Symbol", "Open", "High", "Low", "Close", "Volume USD"]    
-    df.drop(unused, axis = 1, inplace = True)
-
-    # Generate indicators
-    indicators.generate_ema(df, 30)
-    indicators.generate_macd(df)
-    indicators.generate_obv(df)
-    indicators.generate_rsi(df)
-
-    # Remove first 30 days of entries to improve accuracy of calcuated technical indicators in training data
-    df = df[30 * indicators.time_multiplier:]
-    df.reset_index(drop = True, inplace = True)
+    # With fused_indicators, the fused pass is eager: when the columns need more than one
+    # group of FUSED_GROUPS, all of the groups are generated at once, including the ones
+    # not needed. A single group is generated on its own, as without fused_indicators
+    def get_df(self, columns = None):
+        columns = IndicatorFrame.COLUMNS if columns is None else set(columns) | { "Extrema" }
+        required = IndicatorFrame.required_columns(columns)
 
-    # Condense ranges of data after data set rows/entries are finalized
-    # If we do not condense, then all original indicator values will be represented instead
-    if data_condensed:
-        condense(df)
+        fused = [group for group in IndicatorFrame.FUSED_GROUPS if any(column in required for column in group)]
+        if self._fused_indicators and len(fused) > 1:
+            self._get_fused()
 
-    # Generate crossing data after data range is condensed
-    indicators.generate_ema_cross(df)
-    indicators.generate_macd_cross(df)
+        unused = IndicatorFrame.PRICE_COLUMNS + [column for column in self._raw.columns if column.startswith("Volume ")]
 
-    # Generate local price extremas
-    df["Extrema"] = np.nan
+        df = pd.DataFrame({
+            column: self._trim(self._raw[column]) for column in self._raw.columns
+            if column not in unused and column not in IndicatorFrame.COLUMNS
+        })
+        for column in IndicatorFrame.COLUMNS:
+            if column in columns:
+                df[column] = self.get_column(column)
 
-    if extrema_enabled:
-        minima_indices = extrema.local_minima(df["HLCAverage"], extrema_n)
-        maxima_indices = extrema.local_maxima(df["HLCAverage"], extrema_n)
+        return df
 
-        df.loc[minima_indices, "Extrema"] = -1
-        df.loc[maxima_indices, "Extrema"] = 1
+    # Unprocessed values of an indicator column, generated on the whole data set
+    def _get_raw(self, column):
+        if column not in self._raw.columns:
+            if column == "HLCAverage":
+                generated = indicators.generate_hlc(self._raw)
+            else:
+                self._get_raw("HLCAverage")
 
-    return df
+                if column == "EMA30":
+                    generated = indicators.generate_ema(self._raw, 30, self._config)
+                elif column in ("MACD", "MACDSignal"):
+                    generated = indicators.generate_macd(self._raw, self._config)
+                elif column == "OBV":
+                    generated = indicators.generate_obv(self._raw, self._config)
+                elif column == "RSI":
+                    generated = indicators.generate_rsi(self._raw, config = self._config)
+
+            for name, values in generated.items():
+                self._raw[name] = values
+
+        return self._raw[column]
+
+    # Generate the unprocessed values of every group of FUSED_GROUPS in a single pass
+    def _get_fused(self):
+        if any(column not in self._raw.columns for group in IndicatorFrame.FUSED_GROUPS for column in group):
+            self._get_raw("HLCAverage")
+
+            with profiler.stage("fused", len(self._raw)):
+                generated = indicators.generate_fused(self._raw, config = self._config)
+            for name, values in generated.items():
+                self._raw[name] = values
+
+    # Unprocessed values with the warm up rows removed
+    def _trim(self, values):
+        return values[self._warmup_rows:].reset_index(drop = True)
+
+    def _generate(self, column):
+        if column == "Extrema":
+            df = pd.DataFrame({ "HLCAverage": self.get_column("HLCAverage"), "Extrema": np.nan })
+            if self._extrema_enabled:
+                generate_extremas(df, self._extrema_n)
+        elif column.startswith("EMACross") or column.startswith("MACDCross"):
+            # Crossings are generated after the data range is condensed
+            name = "EMA" if column.startswith("EMACross") else "MACD"
+            data, signal = IndicatorFrame.DEPENDENCIES[column]
+
+            df = pd.DataFrame(indicators.generate_cross(self.get_column(data), self.get_column(signal), name))
+            self._columns[name + "CrossDirection"] = df[name + "CrossDirection"]
+        else:
+            values = self._trim(self._get_raw(column)).copy()
+            if self._data_condensed:
+                self._condense(column, values)
 
-def condense(df):
+            df = pd.DataFrame({ column: values })
+
+        self._columns[column] = df[column]
+
+    # Condense the range of an indicator column the same way as condense, in place
+    #
+    # Indicators related to another indicator are condensed based on the unprocessed range
+    # of the other (e.g. MACDSignal on the original MACD range); RSI is already in range
+    # of [0, 100]
+    def _condense(self, column, values):
+        normalization, window = self._normalization, self._normalization_window
+
+        if column in ("HLCAverage", "OBV"):
+            indicators.condense_data_hundred(values, normalization = normalization, window = window)
+        elif column == "EMA30":
+            indicators.condense_data_hundred(values, self._trim(self._get_raw("HLCAverage")), normalization, window)
+        elif column == "MACD":
+            indicators.condense_data(values, normalization = normalization, window = window)
+        elif column == "MACDSignal":
+            indicators.condense_data(values, self._trim(self._get_raw("MACD")), normalization, window)
+
+# Label local price minima (-1) and maxima (1) in the Extrema column of df, leaving the
+# rest of the column untouched
+def generate_extremas(df, extrema_n):
+    minima_indices, maxima_indices = extrema.local_extremas(df["HLCAverage"], extrema_n)
+
+    df.loc[minima_indices, "Extrema"] = -1
+    df.loc[maxima_indices, "Extrema"] = 1
+
+# Returns a copy of a processed dataframe using less memory
+#
+# Crossing directions and extremas (which are -1, 1 or NaN) are stored as int8, where 0
+# means none: a row without a crossing or extrema is 0 rather than NaN. Nothing reads the
+# two differently, as training and Predict.preprocess_data fill NaN with 0 and the
+# backtests compare against -1 and 1. All other float values are stored as float32, which
+# is also the precision the decision tree model uses
+def compact(df):
+    dtypes = {
+        column: np.int8 if column in DIRECTION_COLUMNS else np.float32
+        for column in df.columns if column in DIRECTION_COLUMNS or df[column].dtype == np.float64
+    }
+
+    return df.fillna({ column: 0 for column in DIRECTION_COLUMNS if column in df.columns }).astype(dtypes)
+
+# Configuration of the indicators generated by read_data_from_df, using the HLC average
+# as the price
+#
+# With interval, the interval between rows, periods are scaled to the number of rows per
+# day rather than by data_hourly; this is a fraction for intervals longer than a day or
+# not dividing a day evenly
+def indicator_config(data_hourly = False, interval = None):
+    if interval is not None:
+        time_multiplier = pd.Timedelta(days = 1) / pd.Timedelta(interval)
+        if time_multiplier.is_integer():
+            time_multiplier = int(time_multiplier)
+
+        return indicators.IndicatorConfig("HLCAverage", time_multiplier)
+
+    return indicators.IndicatorConfig("HLCAverage", 24 if data_hourly else 1)
+
+# Returns the number of rows covering the first WARMUP_DAYS, which are removed once the
+# indicators are generated
+def warmup_rows(config):
+    return int(np.ceil(WARMUP_DAYS * config.time_multiplier))
+
+# normalization selects how each column is scaled, see indicators.NORMALIZATIONS; window
+# is the number of rows of the rolling normalization
+def condense(df, normalization = "global", window = None):
     # Range [0, 100]
     # OBV
-    indicators.condense_data_hundred(df["OBV"])
+    indicators.condense_data_hundred(df["OBV"], normalization = normalization, window = window)
     # Price related
-    indicators.condense_data_hundred(df["EMA30"], df["HLCAverage"])
-    indicators.condense_data_hundred(df["HLCAverage"])
+    indicators.condense_data_hundred(df["EMA30"], df["HLCAverage"], normalization, window)
+    indicators.condense_data_hundred(df["HLCAverage"], normalization = normalization, window = window)
 
     # Range [-1, 1]
     # MACD related
     # MACDSignal must come first; it is transformed based on original MACD range    
-    indicators.condense_data(df["MACDSignal"], df["MACD"])
-    indicators.condense_data(df["MACD"])
+    indicators.condense_data(df["MACDSignal"], df["MACD"], normalization, window)
+    indicators.condense_data(df["MACD"], normalization = normalization, window = window)
 
     # RSI is already in range of [0, 100]
 
-def main(print_df = True):
+class IndicatorFrameException(Exception):
+    pass
+
+# Only the indicator columns in columns are generated, e.g. only the features used by a
+# model; all of them are by default
+def main(print_df = True, columns = None):
     data_file_path = "datasets/Coinbase_BTCUSD_1h.csv"
     data_year_range = (2017, 2018)
     extrema_n = 20
 
-    df = read_data(data_file_path, data_year_range, True, True, extrema_n)
+    df = read_data(data_file_path, data_year_range, True, extrema_n = extrema_n, cache_dir = CACHE_DIR, columns = columns)
 
     if print_df:
         print(df)
     return df
 
 if __name__ == "__main__":
-    main()
+    profiler.run_main(main)
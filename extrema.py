@@ -1,10 +1,11 @@
 import numpy as np
+import pandas as pd
 
 def local_minima(df, n):
-    return local_extrema(df, n, np.less_equal)
+    return local_extremas(df, n)[0]
 
 def local_maxima(df, n):
-    return local_extrema(df, n, np.greater_equal)
+    return local_extremas(df, n)[1]
 
 # df         = DataFrame
 # n          = number of rows before and after current data position to consider
@@ -13,6 +14,9 @@ def local_maxima(df, n):
 # A point is considered an extrema (minima or maxima) when the comparator function
 # evaluates to true with the point and the *n* elements before and after it, i.e.
 # the point is less than the surrounding 2n points with point at index i as the center
+#
+# Reference implementation for arbitrary comparators; local_extremas should be used
+# for minima and maxima as it computes both in a single pass in linear time
 def local_extrema(df, n, comparator):
     indices = np.zeros(len(df))
 
@@ -24,3 +28,62 @@ def local_extrema(df, n, comparator):
             indices[i] = 1
 
     return np.nonzero(indices)[0]
+
+# Returns a tuple of (minima indices, maxima indices) with the same results as calling
+# local_extrema with np.less_equal and np.greater_equal respectively
+#
+# Rather than slicing the n elements before and after every point, the minimum and
+# maximum of every window is taken from a rolling min/max over the whole series, so the
+# cost does not grow with n
+def local_extremas(df, n):
+    values = np.asarray(df, dtype = np.float64)
+    length = len(values)
+
+    if n <= 0 or length == 0:
+        # Every search region is empty, so every point is trivially an extrema
+        indices = np.arange(length)
+        return indices, indices
+
+    # The region before a point follows iloc[i-n:i]: when i < n the start is negative and
+    # wraps around to the end, which leaves the region empty unless the series is shorter
+    # than n, in which case it is the (n - length) elements directly before the point
+    if length >= n:
+        before_min, before_max, before_empty = _window_stats(values, n)
+        before_empty[:n] = True
+    else:
+        before_min, before_max, before_empty = _window_stats(values, n - length)
+
+    # The region after a point follows iloc[i+1:i+n+1] which is truncated at the end
+    after_min, after_max, after_empty = _window_stats(values[::-1], n)
+    after_min, after_max, after_empty = after_min[::-1], after_max[::-1], after_empty[::-1]
+
+    # Comparisons against NaN are always false, so a NaN point only counts as an
+    # extrema when both of its search regions are empty (the empty masks cover that)
+    minima = (before_empty | (values <= before_min)) & (after_empty | (values <= after_min))
+    maxima = (before_empty | (values >= before_max)) & (after_empty | (values >= after_max))
+
+    return np.nonzero(minima)[0], np.nonzero(maxima)[0]
+
+# Returns the min and max of the trailing window of the given size that ends on the
+# row before each point, along with a mask where the comparison is vacuously true
+# because the window is empty
+#
+# Windows containing a NaN get a NaN min and max so that comparisons against them
+# are false, matching a comparison against every element of the window
+def _window_stats(values, window):
+    series = pd.Series(values)
+    rolling = series.rolling(window, min_periods = 1)
+    has_nan = series.isna().rolling(window, min_periods = 1).sum().to_numpy() > 0
+
+    window_min = np.where(has_nan, np.nan, rolling.min().to_numpy())
+    window_max = np.where(has_nan, np.nan, rolling.max().to_numpy())
+
+    shifted_min = np.full(len(values), np.nan)
+    shifted_max = np.full(len(values), np.nan)
+    shifted_min[1:] = window_min[:-1]
+    shifted_max[1:] = window_max[:-1]
+
+    empty = np.zeros(len(values), dtype = bool)
+    empty[:1] = True
+
+    return shifted_min, shifted_max, empty
@@ -1,18 +1,59 @@
+from collections import namedtuple
+
 import numpy as np
 import pandas as pd
 
-price_field = "Close"
-time_multiplier = 1 # Default = 1 (day); use 24 if using hourly data
+# Configuration of the indicator calculations, passed to each function that needs it
+# rather than kept in module state so that data sets of different granularities can be
+# processed at the same time, e.g. in separate threads
+#
+# price_field     = column of df used as the price
+# time_multiplier = number of rows per day; 1 for daily data, 24 for hourly data, and a
+#                   fraction for rows longer than a day, e.g. 1 / 7 for weekly data
+IndicatorConfig = namedtuple("IndicatorConfig", ["price_field", "time_multiplier"], defaults = ["Close", 1])
+
+DEFAULT_CONFIG = IndicatorConfig()
+
+# Returns period days as the span of an exponential moving average in rows, at least 1
+# which is the shortest span pandas allows
+def period_span(period, config = DEFAULT_CONFIG):
+    return max(period * config.time_multiplier, 1)
+
+# Returns period days as a window of a whole number of rows, at least 1
+def period_rows(period, config = DEFAULT_CONFIG):
+    return max(int(round(period * config.time_multiplier)), 1)
+
+# How condensed data is scaled:
+#
+# global    = by the range of the entire column, so every row depends on all other rows,
+#             including later ones
+# expanding = by the range of the rows up to and including each row
+# rolling   = by the range of the last window rows up to and including each row
+#
+# With expanding and rolling, the condensed value of a row never changes once the row is
+# known, so it can be condensed as it arrives (see stream_processor.StreamProcessor);
+# rows without any values in their range become NaN, and rows whose range is a single
+# value (e.g. the first row) are placed at the middle of the condensed range
+NORMALIZATIONS = ["global", "expanding", "rolling"]
 
 # Constrain range of data to [-1, 1]
 # Done so that this data can be applied to other data sets
 # We only care about the resultant shape, not the raw numbers
-def condense_data(df_field, reference = None):
+def condense_data(df_field, reference = None, normalization = "global", window = None):
     if reference is None:
         reference = df_field
 
-    midpt = (reference.min() + reference.max()) / 2
-    dist_directional = reference.max() - midpt
+    if normalization == "global":
+        ref_min, ref_max = reference.min(), reference.max()
+    else:
+        ref_min, ref_max = running_range(reference, normalization, window)
+
+    midpt = (ref_min + ref_max) / 2
+    dist_directional = ref_max - midpt
+
+    if normalization != "global":
+        # A range of a single value condenses to the midpoint of 0
+        dist_directional = dist_directional.mask(dist_directional == 0, np.inf)
 
     # Transform data to have a midpoint of 0
     df_field -= midpt
@@ -20,64 +61,246 @@ def condense_data(df_field, reference = None):
     df_field *= 1 / dist_directional
 
 # Constrain range of data to [0, 100]
-def condense_data_hundred(df_field, reference = None):
+def condense_data_hundred(df_field, reference = None, normalization = "global", window = None):
     if reference is None:
         # Copy it because the reference could change if df_field *is* reference
         reference = df_field.copy()
 
-    # Transform data to have zero as fixed point minimum first
-    df_field -= reference.min()
-    # Transform data to range of [0, 100] based on the reference field
-    df_field /= (reference - reference.min()).max() / 100
-
-def generate_cross(df, data_field, signal_field, name):
-    cross_diff = df[name + "CrossDifference"] = data_field - signal_field
-    df[name + "CrossDirection"] = np.where(
-        np.sign(cross_diff.shift().fillna(0)) != np.sign(cross_diff),
-        np.sign(cross_diff),
-        np.nan
-    )
+    if normalization == "global":
+        # Transform data to have zero as fixed point minimum first
+        df_field -= reference.min()
+        # Transform data to range of [0, 100] based on the reference field
+        df_field /= (reference - reference.min()).max() / 100
+    else:
+        ref_min, ref_max = running_range(reference, normalization, window)
+        ref_dist = ref_max - ref_min
+
+        # A range of a single value condenses to the midpoint of 50
+        constant = ref_dist == 0
+        df_field -= ref_min
+        df_field /= ref_dist.mask(constant, np.inf) / 100
+        df_field += constant * 50.0
+
+# Returns the running minimum and maximum of reference at each row for the expanding
+# and rolling normalizations (see NORMALIZATIONS), with NaN for both where there are no
+# values in the range
+def running_range(reference, normalization, window = None):
+    if normalization == "expanding":
+        rows = reference.expanding(min_periods = 1)
+    elif normalization == "rolling" and window is not None:
+        rows = reference.rolling(window, min_periods = 1)
+    else:
+        raise ValueError("Unknown normalization {!r}, or rolling without a window".format(normalization))
+
+    empty = rows.count() == 0
+    return rows.min().mask(empty), rows.max().mask(empty)
+
+# Every indicator is generated by a generate_ function, which only reads its input and
+# returns a dict of the new columns by name rather than changing df, so indicators can be
+# generated at the same time (e.g. in threads); the caller assigns the columns, e.g. with
+# df.assign(**columns)
+
+def generate_cross(data_field, signal_field, name):
+    cross_diff = data_field - signal_field
+    return {
+        name + "CrossDifference": cross_diff,
+        name + "CrossDirection": pd.Series(np.where(
+            np.sign(cross_diff.shift().fillna(0)) != np.sign(cross_diff),
+            np.sign(cross_diff),
+            np.nan
+        ), index = cross_diff.index)
+    }
 
 def generate_hlc(df):
-    df["HLCAverage"] = (df["High"] + df["Low"] + df["Close"]) / 3
+    return { "HLCAverage": (df["High"] + df["Low"] + df["Close"]) / 3 }
 
-def generate_ema(df, period):
+def generate_ema(df, period, config = DEFAULT_CONFIG):
     # period in days
-    df["EMA" + str(period)] = pd.Series.ewm(df[price_field], span = period * time_multiplier, adjust = False).mean()
+    return { "EMA" + str(period): pd.Series.ewm(df[config.price_field], span = period_span(period, config), adjust = False).mean() }
 
 def generate_ema_cross(df):
-    generate_cross(df, df["HLCAverage"], df["EMA30"], "EMA")
+    return generate_cross(df["HLCAverage"], df["EMA30"], "EMA")
+
+def generate_macd(df, config = DEFAULT_CONFIG):
+    price_field = config.price_field
 
-def generate_macd(df):
     # EMA 12 - EMA 26 of price data
-    df["MACD"] = pd.Series.ewm(df[price_field], span = 12 * time_multiplier, adjust = False).mean() - pd.Series.ewm(df[price_field], span = 26 * time_multiplier, adjust = False).mean()
-    
+    macd = pd.Series.ewm(df[price_field], span = period_span(12, config), adjust = False).mean() - pd.Series.ewm(df[price_field], span = period_span(26, config), adjust = False).mean()
+
     # EMA 9 of the MACD
-    df["MACDSignal"] = pd.Series.ewm(df["MACD"], span = 9 * time_multiplier, adjust = False).mean()
+    return { "MACD": macd, "MACDSignal": pd.Series.ewm(macd, span = period_span(9, config), adjust = False).mean() }
 
 def generate_macd_cross(df):
-    generate_cross(df, df["MACD"], df["MACDSignal"], "MACD")
+    return generate_cross(df["MACD"], df["MACDSignal"], "MACD")
+
+# On-balance volume as a running total of signed volume, where the sign is taken from
+# the direction of the price movement since the previous row (no change adds nothing)
+#
+# The first row has no previous price to compare to and starts at its own volume
+def generate_obv(df, config = DEFAULT_CONFIG):
+    price = df[config.price_field].to_numpy()
+    volume = df["Volume"].to_numpy(dtype = np.float64)
+
+    signed_volume = np.empty(len(df))
+    signed_volume[:1] = volume[:1]
+    signed_volume[1:] = np.where(price[1:] > price[:-1], volume[1:], np.where(price[1:] < price[:-1], -volume[1:], 0))
 
-def generate_obv(df):
-    for i in range(len(df)):
-        volume = df.loc[i, "Volume"]
+    return { "OBV": pd.Series(np.cumsum(signed_volume), index = df.index) }
+
+def generate_rsi(df, period = 14, config = DEFAULT_CONFIG):
+    window = period_rows(period, config)
+
+    delta = df[config.price_field].diff()
+    gain, loss = delta.copy(), abs(delta.copy())
+    gain[delta < 0] = 0
+    loss[delta > 0] = 0
+    rs = gain.rolling(window).mean() / loss.rolling(window).mean()
+
+    return { "RSI": 100 - 100 / (1 + rs) }
+
+# Generate the EMA, MACD, MACD signal, OBV and RSI columns in a single pass over the
+# price and volume data, with the same values as generate_ema, generate_macd,
+# generate_obv and generate_rsi
+#
+# Each row only updates the running state of every indicator, avoiding the intermediate
+# series the separate functions create; the pass is compiled with Numba when it is
+# installed, otherwise it runs as plain Python and is much slower than the separate
+# functions (see FUSED_COMPILED)
+#
+# Crossings are not included as they are generated after the data is condensed
+def generate_fused(df, ema_period = 30, rsi_period = 14, config = DEFAULT_CONFIG):
+    def alpha(period):
+        return 2 / (period_span(period, config) + 1)
+
+    out = np.empty((5, len(df)))
+    _fused_kernel(
+        df[config.price_field].to_numpy(dtype = np.float64), df["Volume"].to_numpy(dtype = np.float64),
+        alpha(ema_period), alpha(12), alpha(26), alpha(9), period_rows(rsi_period, config),
+        out
+    )
+
+    names = ["EMA" + str(ema_period), "MACD", "MACDSignal", "OBV", "RSI"]
+    return { name: pd.Series(values, index = df.index) for name, values in zip(names, out) }
+
+# Follows pd.Series.ewm(adjust = False).mean() for a single new value, where weight is the
+# weight of the previous average
+#
+# Returns the new average and weight
+def _ema_step(average, weight, value, alpha):
+    if average == average:
+        weight *= 1 - alpha
+        if value == value:
+            # Same order of operations as pandas, including skipping constant values
+            if average != value:
+                average = (weight * average + alpha * value) / (weight + alpha)
+            weight = 1.0
+    elif value == value:
+        average = value
+
+    return average, weight
+
+# Follows the compensated summation of pd.Series.rolling().mean(); state holds the sum,
+# the compensation when adding and when removing, the number of values, the number of
+# negative values, the number of consecutive equal values and the previous value added
+def _mean_add(state, value):
+    if value == value:
+        y = value - state[1]
+        t = state[0] + y
+        state[1] = t - state[0] - y
+        state[0] = t
+        state[3] += 1
+        if value < 0:
+            state[4] += 1
+
+        state[5] = state[5] + 1 if value == state[6] else 1
+        state[6] = value
+
+def _mean_remove(state, value):
+    if value == value:
+        y = -value - state[2]
+        t = state[0] + y
+        state[2] = t - state[0] - y
+        state[0] = t
+        state[3] -= 1
+        if value < 0:
+            state[4] -= 1
+
+def _mean_get(state, min_periods):
+    if state[3] < min_periods or state[3] == 0:
+        return np.nan
+
+    mean = state[0] / state[3]
+    if state[5] >= state[3]:
+        # All values in the window are equal
+        mean = state[6]
+    elif state[4] == 0 and mean < 0:
+        mean = 0.0
+    elif state[4] == state[3] and mean > 0:
+        mean = 0.0
+
+    return mean
+
+def _fused_loop(price, volume, ema_alpha, fast_alpha, slow_alpha, signal_alpha, rsi_window, out):
+    ema = fast = slow = signal = np.nan
+    ema_weight = fast_weight = slow_weight = signal_weight = 1.0
+    obv = 0.0
+
+    gains = np.empty(len(price))
+    losses = np.empty(len(price))
+    gain_state = np.zeros(7)
+    loss_state = np.zeros(7)
+    gain_state[6] = loss_state[6] = np.nan
+
+    for i in range(len(price)):
+        value = price[i]
+
+        ema, ema_weight = _ema_step(ema, ema_weight, value, ema_alpha)
+        fast, fast_weight = _ema_step(fast, fast_weight, value, fast_alpha)
+        slow, slow_weight = _ema_step(slow, slow_weight, value, slow_alpha)
+        macd = fast - slow
+        signal, signal_weight = _ema_step(signal, signal_weight, macd, signal_alpha)
 
         if i == 0:
-            df.loc[i, "OBV"] = volume
+            obv = volume[i]
+            delta = np.nan
+        else:
+            if value > price[i - 1]:
+                obv += volume[i]
+            elif value < price[i - 1]:
+                obv -= volume[i]
+            delta = value - price[i - 1]
+
+        gains[i] = 0.0 if delta < 0 else delta
+        losses[i] = 0.0 if delta > 0 else abs(delta)
+
+        if i >= rsi_window:
+            _mean_remove(gain_state, gains[i - rsi_window])
+            _mean_remove(loss_state, losses[i - rsi_window])
+        _mean_add(gain_state, gains[i])
+        _mean_add(loss_state, losses[i])
+
+        mean_gain = _mean_get(gain_state, rsi_window)
+        mean_loss = _mean_get(loss_state, rsi_window)
+        if mean_loss == 0:
+            rs = np.nan if mean_gain == 0 or mean_gain != mean_gain else np.inf
         else:
-            prev_obv = df.loc[i - 1, "OBV"]
-            prev_close = df.loc[i - 1, price_field]
-            close = df.loc[i, price_field]
-
-            df.loc[i, "OBV"] = prev_obv + (volume if close > prev_close else (-volume if close < prev_close else 0))
-
-def generate_rsi(df, period = 14):
-    def calculate_rsi(delta):
-        gain, loss = delta.copy(), abs(delta.copy())
-        gain[delta < 0] = 0
-        loss[delta > 0] = 0
-        rs = gain.rolling(period * time_multiplier).mean() / loss.rolling(period * time_multiplier).mean()
-        return 100 - 100 / (1 + rs)
-
-    delta = df[price_field].diff()
-    df["RSI"] = calculate_rsi(delta)
+            rs = mean_gain / mean_loss
+
+        out[0, i] = ema
+        out[1, i] = macd
+        out[2, i] = signal
+        out[3, i] = obv
+        out[4, i] = 100 - 100 / (1 + rs)
+
+try:
+    from numba import njit
+
+    _ema_step = njit(cache = True)(_ema_step)
+    _mean_add = njit(cache = True)(_mean_add)
+    _mean_remove = njit(cache = True)(_mean_remove)
+    _mean_get = njit(cache = True)(_mean_get)
+    _fused_kernel = njit(cache = True)(_fused_loop)
+    FUSED_COMPILED = True
+except ImportError:
+    _fused_kernel = _fused_loop
+    FUSED_COMPILED = False
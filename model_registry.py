@@ -0,0 +1,77 @@
+import os
+import threading
+
+from joblib import load
+
+from compiled_tree import CompiledTree
+
+# Process-wide registry of loaded models, so that every Predict (e.g. of multiple Traders,
+# or of every job run by a sweep worker) using the same model file shares a single copy
+# rather than each loading their own
+#
+# Models are keyed on the real path of their file and are reloaded once the modification
+# time or size of the file changes. Models loaded before worker processes are forked (see
+# warm) are shared with the workers without being loaded again
+#
+# Sample flow / code:
+#
+# model_registry.warm(["models/model.joblib"])
+# model = model_registry.load_model("models/model.joblib")
+# model_registry.get_stats() # { "hits": 1, "misses": 1, "models": 1 }
+
+# Arrays in the model file are memory mapped read only rather than read into memory
+MMAP_MODE = "r"
+
+_lock = threading.Lock()
+_models = {}
+_stats = { "hits": 0, "misses": 0 }
+
+# Returns the model stored in file, loading it only if it is not already loaded or the
+# file has changed since
+def load_model(file):
+    return _get_entry(file)["model"]
+
+# Returns the model stored in file compiled into a CompiledTree, which is kept along with
+# the model so it is only compiled once
+def load_compiled(file):
+    entry = _get_entry(file)
+
+    with _lock:
+        if entry["compiled"] is None:
+            entry["compiled"] = CompiledTree.from_model(entry["model"])
+
+        return entry["compiled"]
+
+# Load every model file ahead of time, e.g. before creating a pool of worker processes
+def warm(files):
+    for file in files:
+        load_model(file)
+
+# Returns the number of loads served from the registry (hits), the number of loads that
+# read the model file (misses), and the number of models currently loaded
+def get_stats():
+    with _lock:
+        return dict(_stats, models = len(_models))
+
+# Forget every loaded model and reset the counters
+def clear():
+    with _lock:
+        _models.clear()
+        _stats.update(hits = 0, misses = 0)
+
+def _get_entry(file):
+    path = os.path.realpath(file)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        entry = _models.get(path)
+        if entry is not None and entry["version"] == version:
+            _stats["hits"] += 1
+            return entry
+
+        # The lock is held while loading so that concurrent loads of the same file only
+        # read it once
+        _stats["misses"] += 1
+        entry = _models[path] = { "version": version, "model": load(path, mmap_mode = MMAP_MODE), "compiled": None }
+        return entry
@@ -1,12 +1,21 @@
-from joblib import load
+import numpy as np
+import pandas as pd
 
+import model_registry
+import profiler
 import train
 
 class Predict:
-    def __init__(self, model_file, k_neighbors = -1, max_conflicts = -1, search_distance = -1):
+    # Indicator columns the model predicts from
+    FEATURE_COLUMNS = train.FEATURE_COLUMNS
+
+    # With compiled_model, the model is compiled into flat arrays (see CompiledTree) which
+    # give the same predictions with much less overhead per call
+    def __init__(self, model_file, k_neighbors = -1, max_conflicts = -1, search_distance = -1, compiled_model = False):
         if k_neighbors < 0 or max_conflicts < 0 or search_distance < 0:
             raise PredictException("Specify legal values for all of: k_neighbors, max_conflicts, search_distance")
 
+        self._compiled_model = compiled_model
         self.load_model(model_file)
         self.set_k_neighbors(k_neighbors)
         self.set_search_distance(search_distance)
@@ -20,22 +29,29 @@ class Predict:
     def feature_attributes(*args, **kwargs):
         return train.split_data(*args, **kwargs)[0]
 
+    # Models are shared with every other Predict in the process using the same file, see
+    # model_registry
     def load_model(self, file):
-        self._model = load(file)
+        self._model = model_registry.load_model(file)
+        self._compiled = model_registry.load_compiled(file) if self._compiled_model else None
 
     # Returns number of removed extremas from the originally predicted data based on
     # the decision tree model
     #
     # Note that the dataframe df is changed in place with predicted extrema results
     def predict_full(self, df, df_features, model_predict_only = False):
-        model_predicted = self.predict_with_model(df_features)
-        self._merge_data(df, model_predicted)
+        with profiler.stage("model", len(df_features)):
+            model_predicted = self.predict_with_model(df_features)
+
+        with profiler.stage("merge", len(df)):
+            self._merge_data(df, model_predicted)
 
         if model_predict_only:
             return 0
-        
-        bad_extremas = self.validate_extremas(df)
-        Predict.delete_extremas(df, bad_extremas)
+
+        with profiler.stage("heuristic", len(df)):
+            bad_extremas = self.validate_extremas(df)
+            Predict.delete_extremas(df, bad_extremas)
 
         return len(bad_extremas)
 
@@ -68,13 +84,60 @@ class Predict:
         self.predict_full(df_point, df_point_features, model_predict_only)
         return df_point.iloc[-1]["Extrema"]
 
+    # Returns number of removed extremas from the originally predicted data based on
+    # the decision tree model
+    #
+    # Gives the same results as calling predict_point for every index in df, i.e. every
+    # extrema is only validated with the data that was available up to its own point in
+    # time, but runs the model once over all rows and validates all rows at once
+    #
+    # Note that the dataframe df is changed in place with predicted extrema results
+    def predict_walk_forward(self, df, df_features, model_predict_only = False):
+        with profiler.stage("model", len(df_features)):
+            extremas = self.predict_array(df_features)
+            df["Extrema"] = extremas
+
+        if model_predict_only:
+            return 0
+
+        with profiler.stage("heuristic", len(df)):
+            # predict_point validates the last row of a slice of at most distance + 1 rows
+            # ending at each index; find the search region of that last row within its slice
+            # and then shift it back to positions in df
+            indices = np.arange(len(df))
+            slice_positions = np.minimum(indices, self._distance)
+            region_start, region_end = Predict._search_regions(slice_positions, slice_positions + 1, self._distance)
+            slice_start = indices - slice_positions
+
+            bad = self._bad_extremas(extremas, region_start + slice_start, region_end + slice_start)
+            bad_extremas = df.index[bad]
+            Predict.delete_extremas(df, bad_extremas)
+
+        return len(bad_extremas)
+
+    # Returns a dataframe with only the predicted "Extrema" column, sharing the index of
+    # df_features; the features themselves are not copied
     def predict_with_model(self, df_features):
-        predict = self._model.predict(df_features)
+        return pd.DataFrame({ "Extrema": self.predict_array(df_features) }, index = df_features.index)
+
+    # Returns the model predictions as a NumPy array in the same order as the rows of
+    # df_features, for callers that do not need them aligned to a dataframe
+    def predict_array(self, df_features):
+        if self._compiled is not None:
+            return self._compiled.predict(df_features.to_numpy())
+
+        return self._model.predict(df_features)
 
-        # Copy it to get rid of pandas error of setting on copy of a slice
-        df_features = df_features.copy()
-        df_features["Extrema"] = predict
-        return df_features
+    # Returns the model prediction for a single row of feature values, given in the order
+    # of FEATURE_COLUMNS, e.g. the latest row of live data
+    def predict_features(self, features):
+        if self._compiled is not None:
+            return self._compiled.predict_one(features)
+
+        return self._model.predict(pd.DataFrame([features], columns = Predict.FEATURE_COLUMNS))[0]
+
+    def get_search_distance(self):
+        return self._distance
 
     @staticmethod
     def preprocess_data(*args, **kwargs):
@@ -95,37 +158,71 @@ class Predict:
     #
     # We want to search df in its unmodified state for our heuristic checks, rather than
     # modifying extrema data in place while still searching through the data frame
+    #
+    # The number of minima and maxima in the search region of every row is taken from
+    # cumulative counts, so all rows are checked at once instead of slicing each region
     def validate_extremas(self, df):
-        bad_indices = []
+        if len(df) == 0:
+            return []
+
+        extremas = df["Extrema"].to_numpy()
 
         # Offset is used to make predict_point work where the sliced dataframes do not
         # start with an index of 0
         #
         # This will be 0 when using predict_full on properly indexed data
         start_offset = df.first_valid_index()
+        positions = (df.index - start_offset).to_numpy()
+
+        region_start, region_end = Predict._search_regions(positions, len(df), self._distance)
 
-        for i, row in df.iterrows():
-            extrema_type = row["Extrema"]
-            if extrema_type == 0:
-                continue
+        bad = self._bad_extremas(extremas, region_start, region_end)
+        return df.index[bad].tolist()
 
-            search_region = df.iloc[i - start_offset - self._distance:i - start_offset]
-            if self._has_conflicts(search_region, extrema_type) or not self._has_k_neighbors(search_region, extrema_type):
-                bad_indices.append(i)
+    # Returns a mask of the extremas that have conflicts or do not have k neighbors within
+    # their [region_start, region_end) search region, given as positions in extremas
+    def _bad_extremas(self, extremas, region_start, region_end):
+        minima_counts = Predict._cumulative_count(extremas == -1)
+        maxima_counts = Predict._cumulative_count(extremas == 1)
+        minima_in_region = minima_counts[region_end] - minima_counts[region_start]
+        maxima_in_region = maxima_counts[region_end] - maxima_counts[region_start]
 
-        return bad_indices
+        # Conflicts are extremas of the opposite type, where 1 = maxima, -1 = minima
+        conflicts = np.where(extremas == 1, minima_in_region, np.where(extremas == -1, maxima_in_region, 0))
+        neighbors = np.where(extremas == 1, maxima_in_region, np.where(extremas == -1, minima_in_region, 0))
 
-    def _has_conflicts(self, region, extrema_type):
-        # Note that (extrema_type * -1) is the opposite extrema type, where 1 = maxima, -1 = minima
-        return len(region[region["Extrema"] == extrema_type * -1]) > self._max_conflicts
+        return (extremas != 0) & ((conflicts > self._max_conflicts) | (neighbors < self._k))
+
+    # Returns the number of true values before each position, with one more entry than
+    # there are values so that the count of any [start, end) range is a subtraction
+    @staticmethod
+    def _cumulative_count(mask):
+        counts = np.zeros(len(mask) + 1, dtype = np.int64)
+        np.cumsum(mask, out = counts[1:])
+        return counts
+
+    # Returns the [start, end) bounds of the search region before each position, following
+    # the bounds of the slice df.iloc[position - distance:position]
+    #
+    # As with any slice, a negative bound counts from the end of the data frame; for the
+    # first rows this leaves the region empty unless the data frame is shorter than the
+    # search distance, which is the case in predict_point near the start of the data
+    @staticmethod
+    def _search_regions(positions, length, distance):
+        def slice_bound(bound):
+            return np.clip(np.where(bound < 0, bound + length, bound), 0, length)
 
-    def _has_k_neighbors(self, region, extrema_type):
-        return len(region[region["Extrema"] == extrema_type]) >= self._k
+        region_end = slice_bound(positions)
+        region_start = np.minimum(slice_bound(positions - distance), region_end)
+        return region_start, region_end
 
+    # Copies the predicted extremas into df for the rows with matching indices, in a single
+    # assignment rather than row by row
     def _merge_data(self, df, predicted_extremas):
-        # TODO: is there a better way to do this?
-        for i, row in predicted_extremas.iterrows():
-            df.loc[i, "Extrema"] = row["Extrema"]
+        if df.index.equals(predicted_extremas.index):
+            df["Extrema"] = predicted_extremas["Extrema"].to_numpy()
+        else:
+            df.loc[predicted_extremas.index, "Extrema"] = predicted_extremas["Extrema"].to_numpy()
 
 class PredictException(Exception):
     pass
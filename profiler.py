@@ -0,0 +1,178 @@
+import argparse
+import json
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+# Timing of the stages of the pipeline (parsing, each indicator, the model, heuristics,
+# strategies, ...), recording the wall time, number of rows processed and peak memory of
+# every stage
+#
+# Stages are marked in the code with:
+#
+# with profiler.stage("name", rows):
+#     ...
+#
+# Profiling is off by default, in which case a stage costs a single function call and
+# nothing is recorded. Stages may be nested; a nested stage is named after the stages
+# it is within, e.g. "read_data/OBV"
+#
+# Sample flow / code:
+#
+# profiler.enable()
+# backtest.predict_extremas( ... )
+# profiler.print_summary()
+#
+# The main functions of backtest.py, train.py and data_processor.py are profiled with the
+# --profile table or --profile json command line option
+
+SUMMARY_COLUMNS = ["Stage", "Calls", "Seconds", "Rows", "PeakMemoryMB"]
+
+_enabled = False
+_trace_memory = False
+_records = []
+_local = threading.local()
+
+# Turn on profiling; with trace_memory, the peak memory allocated during every stage is
+# also recorded, which slows down everything being profiled
+def enable(trace_memory = False):
+    global _enabled, _trace_memory
+    _enabled, _trace_memory = True, trace_memory
+
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def disable():
+    global _enabled
+    _enabled = False
+
+    if _trace_memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def is_enabled():
+    return _enabled
+
+# Forget every recorded stage
+def reset():
+    del _records[:]
+
+# Returns a context manager timing the code within it as the stage name, which processes
+# rows rows (if known); rows can also be set within the stage with set_rows
+def stage(name, rows = None):
+    if not _enabled:
+        return _NULL_STAGE
+
+    return _Stage(name, rows)
+
+# Returns a dataframe of the recorded stages, with the calls, total seconds, total rows
+# and largest peak memory in MB of each stage, in the order they were first entered
+def get_summary():
+    df = pd.DataFrame(list(_records), columns = ["Stage", "Seconds", "Rows", "PeakMemoryMB"])
+    if len(df) == 0:
+        return pd.DataFrame(columns = SUMMARY_COLUMNS)
+
+    df_summary = df.groupby("Stage", sort = False).agg(
+        Calls = ("Seconds", "size"), Seconds = ("Seconds", "sum"),
+        Rows = ("Rows", lambda rows: rows.sum(min_count = 1)), PeakMemoryMB = ("PeakMemoryMB", "max")
+    )
+    df_summary.reset_index(inplace = True)
+    return df_summary[SUMMARY_COLUMNS]
+
+# Print the summary as a table, or as JSON with output_format "json"
+def print_summary(output_format = "table"):
+    df_summary = get_summary()
+
+    if output_format == "json":
+        print(json.dumps(json.loads(df_summary.to_json(orient = "records")), indent = 2))
+    else:
+        print(df_summary.to_string(index = False))
+
+# Run main, profiling it when the command line asks for it (--profile table or --profile
+# json) and printing the summary once it returns
+def run_main(main, args = None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", choices = ["table", "json"], help = "print the time spent in each stage")
+    parser.add_argument("--profile-memory", action = "store_true", help = "also record the peak memory of each stage")
+    options = parser.parse_args(args)
+
+    if options.profile is None:
+        return main()
+
+    enable(options.profile_memory)
+    try:
+        with stage("main"):
+            result = main()
+    finally:
+        disable()
+
+    print_summary(options.profile)
+    return result
+
+class _Stage:
+    def __init__(self, name, rows):
+        self._name = name
+        self._rows = rows
+
+    def __enter__(self):
+        stack = _stack()
+        self._path = "/".join([frame._name for frame in stack] + [self._name])
+
+        if _trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, peak)
+
+            self._start_memory, self._peak = current, current
+            _reset_peak()
+
+        stack.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self._start
+        stack = _stack()
+        stack.pop()
+
+        peak_mb = None
+        if _trace_memory and tracemalloc.is_tracing():
+            self._peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+            peak_mb = (self._peak - self._start_memory) / 2 ** 20
+
+            # The enclosing stage continues measuring its own peak from here on
+            if stack:
+                stack[-1]._peak = max(stack[-1]._peak, self._peak)
+            _reset_peak()
+
+        _records.append((self._path, elapsed, self._rows, peak_mb))
+        return False
+
+    def set_rows(self, rows):
+        self._rows = rows
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def set_rows(self, rows):
+        pass
+
+_NULL_STAGE = _NullStage()
+
+# Stages entered by the current thread
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+
+    return _local.stack
+
+# Peak memory can only be reset from Python 3.9; before that, peaks are measured from the
+# start of tracing
+def _reset_peak():
+    if hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
@@ -0,0 +1,115 @@
+import asyncio
+
+import pandas as pd
+
+from async_trader import AsyncTrader
+from predict import Predict
+
+import data_processor
+
+# A local simulated exchange and data feed for testing an AsyncTrader without a trading
+# platform, by replaying a data set as if its candles were received live
+#
+# Sample flow / code:
+#
+# exchange = SimulatedExchange(latency = 0.05)
+# trader = SimulatedTrader(predictor, exchange)
+# asyncio.run(trader.run(simulated_feed(df, interval = 0.01, burst_size = 24)))
+# exchange.get_orders()
+
+class SimulatedExchange:
+    # Starts with balance in the quote currency (e.g. USD) and no units of the asset;
+    # every order takes latency seconds to be filled
+    def __init__(self, balance = 100.0, latency = 0.0):
+        self._balance = balance
+        self._units = 0.0
+        self._latency = latency
+        self._orders = []
+
+    # Buy as many units as the balance allows at price
+    async def buy(self, date, price):
+        await asyncio.sleep(self._latency)
+
+        if self._balance > 0:
+            self._units, self._balance = self._balance / price, 0.0
+            self._orders.append((date, -1, price, self._units, self._units * price))
+
+    # Sell all units at price
+    async def sell(self, date, price):
+        await asyncio.sleep(self._latency)
+
+        if self._units > 0:
+            self._units, self._balance = 0.0, self._units * price
+            self._orders.append((date, 1, price, 0.0, self._balance))
+
+    # Returns every filled order, with the same Extrema values for buys (-1) and sells (1)
+    # as backtest_strategy.generate_tx_summary
+    def get_orders(self):
+        return pd.DataFrame(self._orders, columns = ["Date", "Extrema", "Price", "UnitsOwned", "Value"])
+
+    def get_balance(self):
+        return self._balance
+
+    def get_units(self):
+        return self._units
+
+# Yields the rows of df, a dataframe compatible with the data processor module, as
+# dicts one candle at a time
+#
+# Candles arrive in bursts of burst_size at once, with interval seconds between bursts
+async def simulated_feed(df, interval = 0.0, burst_size = 1):
+    columns = ["Date", "High", "Low", "Close", "Volume"]
+
+    for i, row in enumerate(zip(*(df[column] for column in columns))):
+        if i > 0 and i % burst_size == 0:
+            await asyncio.sleep(interval)
+
+        yield dict(zip(columns, row))
+
+# AsyncTrader placing orders on a SimulatedExchange at the close price of the latest
+# candle received from simulated_feed
+#
+# Candles are processed incrementally, as the feed only gives the new candles
+class SimulatedTrader(AsyncTrader):
+    def __init__(self, predictor, exchange, **kwargs):
+        super().__init__(predictor, processor_incremental = True, **kwargs)
+
+        self._exchange = exchange
+        self._last_candle = None
+
+    def adapt_data(self, data):
+        return self.adapt_data_batch([data])
+
+    # Candles arrive in date order, so they only need to be placed in a dataframe
+    def adapt_data_batch(self, data):
+        self._last_candle = data[-1]
+        return pd.DataFrame(data)
+
+    async def make_buy_transaction(self):
+        await self._exchange.buy(self._last_candle["Date"], self._last_candle["Close"])
+
+    async def make_sell_transaction(self):
+        await self._exchange.sell(self._last_candle["Date"], self._last_candle["Close"])
+
+def main():
+    # Replay 2019 as in backtest.py, with the 30 days before it to warm up the indicators
+    df = data_processor.read_csv_range("datasets/Coinbase_BTCUSD_1h.csv", pd.Timestamp(2019, 1, 1), pd.Timestamp(2019, 12, 31), data_processor.WARMUP_DAYS)
+
+    predictor = Predict(
+        "models/model.joblib",
+        k_neighbors = 5,
+        max_conflicts = 2,
+        search_distance = 26,
+        compiled_model = True
+    )
+    exchange = SimulatedExchange(latency = 0.001)
+    trader = SimulatedTrader(predictor, exchange)
+
+    asyncio.run(trader.run(simulated_feed(df, interval = 0.001, burst_size = 24)))
+
+    print(exchange.get_orders())
+    print("Balance:", exchange.get_balance(), "Units:", exchange.get_units())
+    print(trader.get_stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import data_processor
+import indicators
+
+# StreamProcessor is the incremental counterpart of data_processor.read_data_from_df
+#
+# Rather than recomputing every indicator over the entire history whenever new data
+# arrives, it keeps the running state of each indicator (EMA values, OBV total, RSI
+# windows, min/max used for condensing) and updates it in constant time per new row
+#
+# The resulting dataframe has the same columns and values as read_data_from_df with
+# extremas disabled; extremas are determined by looking ahead in the data, which is
+# not possible on live data, and are instead filled in by the predictor
+#
+# With the global normalization, condensed rows are rescaled whenever the range of the
+# history grows; with the expanding and rolling normalizations (see
+# indicators.NORMALIZATIONS) each row is scaled by the range known when it arrived, which
+# never changes afterwards
+#
+# A row with the same date as the last processed row replaces it, e.g. an update of the
+# candle that is still forming; only the last row can be replaced
+#
+# Sample flow / code:
+#
+# stream = StreamProcessor(data_condensed = True, data_hourly = True)
+# stream.extend(df_history)
+# while True:
+#     stream.update( ... newly received candle with Date, High, Low, Close, Volume ... )
+#     df = stream.get_data(27)
+
+class StreamProcessor:
+    def __init__(self, data_condensed = False, data_hourly = False, normalization = "global", normalization_window = None):
+        if normalization not in indicators.NORMALIZATIONS or (normalization == "rolling" and normalization_window is None):
+            raise StreamProcessorException("Specify a normalization of indicators.NORMALIZATIONS, with a window if rolling")
+
+        self._data_condensed = data_condensed
+        config = data_processor.indicator_config(data_hourly)
+
+        # Same periods as used by data_processor.read_data_from_df
+        self._ema30 = _EMA(indicators.period_span(30, config))
+        self._ema12 = _EMA(indicators.period_span(12, config))
+        self._ema26 = _EMA(indicators.period_span(26, config))
+        self._macd_signal = _EMA(indicators.period_span(9, config))
+        self._rsi = _RSI(indicators.period_rows(14, config))
+
+        self._prev_price = None
+        self._obv = None
+
+        # The first days of entries are not kept, as in read_data_from_df
+        self._warmup_rows = data_processor.warmup_rows(config)
+        self._rows_seen = 0
+        self._last_date = None
+        # State of the stream before the last row, restored when the last row is replaced
+        self._undo = None
+
+        self._columns = { name: [] for name in StreamProcessor.COLUMNS }
+        self._ranges = {
+            name: _RollingRange(normalization_window) if normalization == "rolling" else _Range()
+            for name in ("HLCAverage", "MACD", "OBV")
+        }
+
+        # The range of each row when it arrived, for the expanding and rolling normalizations
+        self._row_ranges = { name: ([], []) for name in self._ranges } if normalization != "global" else None
+
+    # Column order of the dataframe produced by read_data_from_df
+    COLUMNS = ["Date", "Volume", "HLCAverage", "EMA30", "MACD", "MACDSignal", "OBV", "RSI"]
+
+    # Processes every row of a dataframe compatible with the data processor module, in
+    # ascending date order
+    def extend(self, df):
+        for date, high, low, close, volume in zip(df["Date"], df["High"], df["Low"], df["Close"], df["Volume"]):
+            self._update(date, high, low, close, volume)
+
+    # Date of the most recently processed row, including rows only used for warming up
+    def get_last_date(self):
+        return self._last_date
+
+    # Returns the processed data as a dataframe, optionally limited to the last_rows most
+    # recent rows
+    #
+    # Only the returned rows are condensed and have their crossings generated, so the
+    # cost depends on last_rows rather than on the length of the history; the index
+    # matches the one read_data_from_df would give the full history
+    def get_data(self, last_rows = None):
+        total = len(self)
+        start = 0 if last_rows is None else max(total - last_rows, 0)
+        # One extra row before the start is needed to determine the crossing directions
+        context_start = max(start - 1, 0)
+
+        df = pd.DataFrame(
+            { name: values[context_start:] for name, values in self._columns.items() },
+            index = pd.RangeIndex(context_start, total)
+        )
+        df["Date"] = pd.to_datetime(df["Date"])
+
+        if self._data_condensed:
+            self._condense(df, context_start)
+
+        for name, data_field, signal_field in (("EMA", "HLCAverage", "EMA30"), ("MACD", "MACD", "MACDSignal")):
+            for column, values in indicators.generate_cross(df[data_field], df[signal_field], name).items():
+                df[column] = values
+
+        df["Extrema"] = np.nan
+        return df.loc[start:]
+
+    # Processes a single row of data, e.g. a newly received candle, which should be more
+    # recent than every row processed before it or have the same date as the last one to
+    # replace it
+    #
+    # Returns True if a row was appended, or False if the row was only used to warm up
+    # the indicators
+    def update(self, row):
+        return self._update(row["Date"], row["High"], row["Low"], row["Close"], row["Volume"])
+
+    def _condense(self, df, start):
+        # Same transformations as data_processor.condense but based on the running ranges
+        # of the full history rather than the ranges of the rows in df
+        def get_range(reference):
+            if self._row_ranges is None:
+                return self._ranges[reference].get()
+
+            # Rows without any values in their range are NaN, as in indicators.running_range
+            return tuple(np.array(values[start:], dtype = np.float64) for values in self._row_ranges[reference])
+
+        # As in indicators.condense_data_hundred and condense_data, with the expanding and
+        # rolling normalizations a range of a single value condenses to its midpoint
+        def constant_range(dist):
+            return (dist == 0) & (self._row_ranges is not None)
+
+        def condense_hundred(name, reference):
+            ref_min, ref_max = get_range(reference)
+            ref_dist = ref_max - ref_min
+            constant = constant_range(ref_dist)
+            df[name] = (df[name] - ref_min) / (np.where(constant, np.inf, ref_dist) / 100) + constant * 50.0
+
+        def condense(name, reference):
+            ref_min, ref_max = get_range(reference)
+            midpt = (ref_min + ref_max) / 2
+            dist_directional = ref_max - midpt
+            df[name] = (df[name] - midpt) * (1 / np.where(constant_range(dist_directional), np.inf, dist_directional))
+
+        condense_hundred("OBV", "OBV")
+        condense_hundred("EMA30", "HLCAverage")
+        condense_hundred("HLCAverage", "HLCAverage")
+        condense("MACDSignal", "MACD")
+        condense("MACD", "MACD")
+
+    def _update(self, date, high, low, close, volume):
+        if self._last_date is not None and date == self._last_date:
+            self._undo_last()
+
+        self._undo = (self._prev_price, self._obv, self._last_date, self._rows_seen)
+        price = (high + low + close) / 3
+
+        ema30 = self._ema30.update(price)
+        macd = self._ema12.update(price) - self._ema26.update(price)
+        macd_signal = self._macd_signal.update(macd)
+        rsi = self._rsi.update(price)
+
+        if self._prev_price is None:
+            self._obv = volume
+        elif price > self._prev_price:
+            self._obv += volume
+        elif price < self._prev_price:
+            self._obv -= volume
+        self._prev_price = price
+        self._last_date = date
+
+        self._rows_seen += 1
+        if self._rows_seen <= self._warmup_rows:
+            return False
+
+        values = (date, volume, price, ema30, macd, macd_signal, self._obv, rsi)
+        for name, value in zip(StreamProcessor.COLUMNS, values):
+            self._columns[name].append(value)
+
+        self._ranges["HLCAverage"].update(price)
+        self._ranges["MACD"].update(macd)
+        self._ranges["OBV"].update(self._obv)
+
+        if self._row_ranges is not None:
+            for name, (row_min, row_max) in self._row_ranges.items():
+                ref_min, ref_max = self._ranges[name].get()
+                row_min.append(ref_min)
+                row_max.append(ref_max)
+
+        return True
+
+    # Restores the state of the stream from before the last row was processed
+    def _undo_last(self):
+        if self._rows_seen > self._warmup_rows:
+            for values in self._columns.values():
+                values.pop()
+
+            for name, range_ in self._ranges.items():
+                range_.undo()
+                if self._row_ranges is not None:
+                    for values in self._row_ranges[name]:
+                        values.pop()
+
+        for indicator in (self._ema30, self._ema12, self._ema26, self._macd_signal, self._rsi):
+            indicator.undo()
+
+        self._prev_price, self._obv, self._last_date, self._rows_seen = self._undo
+
+    def __len__(self):
+        return len(self._columns["Date"])
+
+# Exponential moving average equivalent to pd.Series.ewm(span = span, adjust = False).mean()
+class _EMA:
+    def __init__(self, span):
+        self._alpha = 2 / (span + 1)
+        self._value = None
+        self._previous = None
+
+    def update(self, value):
+        self._previous = self._value
+
+        if self._value is None:
+            self._value = value
+        else:
+            # Same order of operations as the pandas implementation
+            old_weight, new_weight = 1 - self._alpha, self._alpha
+            self._value = (old_weight * self._value + new_weight * value) / (old_weight + new_weight)
+
+        return self._value
+
+    # Restores the value from before the last update
+    def undo(self):
+        self._value = self._previous
+
+# Relative strength index equivalent to indicators.generate_rsi, using running sums of
+# the gains and losses within the window
+class _RSI:
+    def __init__(self, period):
+        self._period = period
+        self._prev_price = None
+        self._window = deque()
+        self._gain_sum = _KahanSum()
+        self._loss_sum = _KahanSum()
+        self._undo = None
+
+    def update(self, price):
+        # The previous price and sums, and whether a delta was added or removed
+        self._undo = (self._prev_price, self._gain_sum.get_state(), self._loss_sum.get_state(), False, None)
+
+        if self._prev_price is None:
+            self._prev_price = price
+            return np.nan
+
+        delta = price - self._prev_price
+        self._prev_price = price
+
+        gain, loss = max(delta, 0), max(-delta, 0)
+        self._window.append((gain, loss))
+        self._gain_sum.add(gain)
+        self._loss_sum.add(loss)
+
+        removed = None
+        if len(self._window) > self._period:
+            removed = old_gain, old_loss = self._window.popleft()
+            self._gain_sum.add(-old_gain)
+            self._loss_sum.add(-old_loss)
+        self._undo = self._undo[:3] + (True, removed)
+
+        if len(self._window) < self._period:
+            return np.nan
+
+        with np.errstate(divide = "ignore", invalid = "ignore"):
+            rs = np.float64(self._gain_sum.get() / self._period) / np.float64(self._loss_sum.get() / self._period)
+            return 100 - 100 / (1 + rs)
+
+    # Restores the window and sums from before the last update
+    def undo(self):
+        self._prev_price, gain_state, loss_state, added, removed = self._undo
+
+        if added:
+            self._window.pop()
+        if removed is not None:
+            self._window.appendleft(removed)
+        self._gain_sum.set_state(gain_state)
+        self._loss_sum.set_state(loss_state)
+
+# Compensated running sum so that adding and removing values over a long stream does not
+# accumulate floating point error
+class _KahanSum:
+    def __init__(self):
+        self._sum = 0.0
+        self._compensation = 0.0
+
+    def add(self, value):
+        y = value - self._compensation
+        t = self._sum + y
+        self._compensation = (t - self._sum) - y
+        self._sum = t
+
+    def get(self):
+        return self._sum
+
+    def get_state(self):
+        return self._sum, self._compensation
+
+    def set_state(self, state):
+        self._sum, self._compensation = state
+
+# Running minimum and maximum, ignoring NaN values as pandas does
+class _Range:
+    def __init__(self):
+        self._min = np.nan
+        self._max = np.nan
+        self._previous = None
+
+    def get(self):
+        return self._min, self._max
+
+    def update(self, value):
+        self._previous = self._min, self._max
+        self._min = np.fmin(self._min, value)
+        self._max = np.fmax(self._max, value)
+
+    # Restores the range from before the last update
+    def undo(self):
+        self._min, self._max = self._previous
+
+# Running minimum and maximum of the last window values, ignoring NaN values as pandas
+# does
+#
+# Candidates for the minimum and maximum are kept in monotonic queues, so each update
+# takes constant time on average regardless of the window
+class _RollingRange:
+    def __init__(self, window):
+        self._window = window
+        self._count = 0
+        self._minima = deque()
+        self._maxima = deque()
+        # Candidates removed from the back and from the front of each queue by the last
+        # update, and whether it added a candidate
+        self._undo = None
+
+    def get(self):
+        if not self._minima:
+            return np.nan, np.nan
+
+        return self._minima[0][1], self._maxima[0][1]
+
+    def update(self, value):
+        self._count += 1
+        added = not np.isnan(value)
+        removed_back = ([], [])
+        removed_front = ([], [])
+
+        if added:
+            while self._minima and self._minima[-1][1] >= value:
+                removed_back[0].append(self._minima.pop())
+            while self._maxima and self._maxima[-1][1] <= value:
+                removed_back[1].append(self._maxima.pop())
+
+            self._minima.append((self._count, value))
+            self._maxima.append((self._count, value))
+
+        for candidates, removed in zip((self._minima, self._maxima), removed_front):
+            while candidates and candidates[0][0] <= self._count - self._window:
+                removed.append(candidates.popleft())
+
+        self._undo = (added, removed_back, removed_front)
+
+    # Restores the queues from before the last update; the candidates removed by an
+    # update are put back in reverse order
+    def undo(self):
+        added, removed_back, removed_front = self._undo
+
+        for candidates, back, front in zip((self._minima, self._maxima), removed_back, removed_front):
+            candidates.extendleft(reversed(front))
+            if added:
+                candidates.pop()
+            candidates.extend(reversed(back))
+
+        self._count -= 1
+
+class StreamProcessorException(Exception):
+    pass
@@ -0,0 +1,201 @@
+from itertools import product
+from multiprocessing import Pool, shared_memory
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from predict import Predict
+
+import backtest_strategy as strategy
+import data_processor
+import model_registry
+import train
+
+# Parameter sweep over the prediction heuristic settings and the extrema labelling
+# distance used for training, to find the combinations that backtest best
+#
+# For every value of extrema_n a model is trained on the training range; every
+# combination of the grid is then backtested on the testing range in a pool of worker
+# processes, which share the processed testing data through shared memory rather than
+# each receiving their own copy
+#
+# Sample flow / code:
+#
+# results = run_sweep({ "k_neighbors": [3, 5], "max_conflicts": [1, 2], "search_distance": [20, 26], "extrema_n": [10, 20] })
+
+GRID_KEYS = ["extrema_n", "k_neighbors", "max_conflicts", "search_distance"]
+
+# Returns a dataframe of the final ProfitLoss and number of transactions of every
+# combination in grid, ranked from most to least profitable
+#
+# grid maps every key of GRID_KEYS to the list of values to try
+def run_sweep(grid,
+        data_file_path = "datasets/Coinbase_BTCUSD_1h.csv", data_hourly = None,
+        train_year_range = (2017, 2018), test_year_range = (2019,),
+        processes = None, results_file = None, cache_dir = None):
+    missing = [key for key in GRID_KEYS if key not in grid]
+    if missing:
+        raise SweepException("Specify values in the grid for all of: " + ", ".join(missing))
+
+    # Indicators do not depend on extrema_n, so they are only computed once for each range,
+    # and only the ones used by the model
+    df_train = data_processor.read_data(data_file_path, train_year_range, True, data_hourly, extrema_enabled = False,
+        cache_dir = cache_dir, columns = train.FEATURE_COLUMNS)
+    df_test = data_processor.read_data(data_file_path, test_year_range, True, data_hourly, extrema_enabled = False,
+        cache_dir = cache_dir, columns = train.FEATURE_COLUMNS)
+    Predict.preprocess_data(df_test)
+
+    shared_test = SharedFrame.create(df_test)
+
+    try:
+        with tempfile.TemporaryDirectory() as model_dir:
+            model_files = {
+                extrema_n: train_model(df_train, extrema_n, os.path.join(model_dir, "model-{}.joblib".format(extrema_n)))
+                for extrema_n in grid["extrema_n"]
+            }
+
+            # Workers forked from this process share the models loaded here rather than each
+            # loading their own
+            model_registry.warm(model_files.values())
+
+            jobs = [
+                dict(zip(GRID_KEYS, values), model_file = model_files[values[0]])
+                for values in product(*(grid[key] for key in GRID_KEYS))
+            ]
+
+            with Pool(processes, initializer = _init_worker, initargs = (shared_test.get_spec(),)) as pool:
+                results = pool.map(_evaluate, jobs)
+    finally:
+        shared_test.unlink()
+
+    df_results = pd.DataFrame(results, columns = GRID_KEYS + ["ProfitLoss", "Transactions"])
+    df_results.sort_values("ProfitLoss", ascending = False, inplace = True)
+    df_results.reset_index(drop = True, inplace = True)
+
+    if results_file is not None:
+        df_results.to_csv(results_file, index = False)
+
+    return df_results
+
+# Label the extremas of the training data using extrema_n, then train and save a model
+# to model_file
+#
+# Returns model_file
+def train_model(df_train, extrema_n, model_file):
+    df = df_train.copy()
+    data_processor.generate_extremas(df, extrema_n)
+    train.preprocess_data(df)
+
+    features, target = train.split_data(df)
+    train.save_decision_tree(train.make_decision_tree(features, target), model_file)
+
+    return model_file
+
+# Backtest a single combination of parameters on df, which is modified in place
+#
+# Returns the final ProfitLoss and the number of transactions made
+def backtest(df, model_file, k_neighbors, max_conflicts, search_distance):
+    predict = Predict(
+        model_file,
+        k_neighbors = k_neighbors,
+        max_conflicts = max_conflicts,
+        search_distance = search_distance
+    )
+    predict.predict_full(df, Predict.feature_attributes(df))
+
+    profit_loss, transactions, _ = strategy.simulate(df["Extrema"].to_numpy(), df["HLCAverage"].to_numpy())
+
+    # No transactions can be simulated if every extrema was removed
+    if transactions == 0:
+        return 0.0, 0
+
+    return float(profit_loss), int(transactions)
+
+# SharedFrame places the numeric columns of a dataframe in a single shared memory block
+# so that worker processes can read it without it being pickled and copied to each one
+#
+# Dates are stored as seconds since the epoch, which float64 represents exactly
+class SharedFrame:
+    def __init__(self, shm, columns, num_rows):
+        self._shm = shm
+        self._columns = columns
+        self._num_rows = num_rows
+
+    @staticmethod
+    def create(df):
+        # Dates first and Extrema last so that all other columns are contiguous
+        columns = ["Date"] + [column for column in df.columns if column not in ("Date", "Extrema")] + ["Extrema"]
+        shm = shared_memory.SharedMemory(create = True, size = max(len(columns) * len(df), 1) * 8)
+
+        data = np.ndarray((len(columns), len(df)), dtype = np.float64, buffer = shm.buf)
+        for i, column in enumerate(columns):
+            if column == "Date":
+                data[i] = df[column].to_numpy(dtype = "datetime64[s]").astype(np.int64)
+            else:
+                data[i] = df[column].to_numpy(dtype = np.float64)
+
+        return SharedFrame(shm, columns, len(df))
+
+    @staticmethod
+    def attach(spec):
+        name, columns, num_rows = spec
+        return SharedFrame(shared_memory.SharedMemory(name = name), columns, num_rows)
+
+    # Returns a new dataframe backed by the shared memory block
+    #
+    # Dates and the Extrema column are copied, the latter as it is modified by prediction
+    # and backtesting; the remaining columns are views which must only be read
+    def get_df(self):
+        data = np.ndarray((len(self._columns), self._num_rows), dtype = np.float64, buffer = self._shm.buf)
+
+        # A single two dimensional block is used by pandas without copying it, as long as
+        # no columns within it are replaced
+        df = pd.DataFrame(data[1:-1].T, columns = self._columns[1:-1], copy = False)
+
+        df.insert(0, "Date", pd.to_datetime(data[0], unit = "s"))
+        df["Extrema"] = data[-1].copy()
+        return df
+
+    # Returns what is needed to attach to the shared memory block from another process
+    def get_spec(self):
+        return self._shm.name, self._columns, self._num_rows
+
+    def unlink(self):
+        self._shm.close()
+        self._shm.unlink()
+
+class SweepException(Exception):
+    pass
+
+# Shared testing data attached to once by every worker process
+_worker_frame = None
+
+def _init_worker(spec):
+    global _worker_frame
+    _worker_frame = SharedFrame.attach(spec)
+
+def _evaluate(job):
+    profit_loss, transactions = backtest(
+        _worker_frame.get_df(), job["model_file"],
+        job["k_neighbors"], job["max_conflicts"], job["search_distance"]
+    )
+
+    result = { key: job[key] for key in GRID_KEYS }
+    result.update(ProfitLoss = profit_loss, Transactions = transactions)
+    return result
+
+def main():
+    grid = {
+        "extrema_n": [10, 20, 30],
+        "k_neighbors": [3, 5, 7],
+        "max_conflicts": [1, 2, 3],
+        "search_distance": [20, 26, 32]
+    }
+
+    df_results = run_sweep(grid, results_file = "sweep-results.csv", cache_dir = data_processor.CACHE_DIR)
+    print(df_results)
+
+if __name__ == "__main__":
+    main()
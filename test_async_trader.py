@@ -0,0 +1,133 @@
+import asyncio
+
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from predict import Predict
+from simulated_exchange import SimulatedExchange, SimulatedTrader, simulated_feed
+from trader import Trader
+
+import data_processor
+import train
+
+# Tests that an AsyncTrader fed by simulated_feed places the same orders as the
+# synchronous Trader updated with the same data, and that errors reach the caller of
+# run, run with: python -m pytest
+
+DATA_FILE = "datasets/Coinbase_BTCUSD_1h.csv"
+
+@pytest.fixture(scope = "module")
+def model_file(tmp_path_factory):
+    df = data_processor.read_data(DATA_FILE, data_condensed = True, data_hourly = True,
+        start_time = "2018-01-01", end_time = "2019-01-01", columns = train.FEATURE_COLUMNS)
+    train.preprocess_data(df)
+    model = DecisionTreeClassifier(max_depth = 6, random_state = 0).fit(*train.split_data(df))
+
+    file = str(tmp_path_factory.mktemp("models") / "model.joblib")
+    train.save_decision_tree(model, file)
+    return file
+
+@pytest.fixture(scope = "module")
+def df_candles():
+    return data_processor.read_csv_range(DATA_FILE, pd.Timestamp(2019, 2, 1), pd.Timestamp(2019, 3, 1), data_processor.WARMUP_DAYS)
+
+def make_predictor(model_file):
+    return Predict(model_file, k_neighbors = 0, max_conflicts = 2, search_distance = 5)
+
+# SimulatedTrader recording the candles of every update and every order it dispatches
+class RecordingTrader(SimulatedTrader):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.batches = []
+        self.orders = []
+
+    def adapt_data_batch(self, data):
+        self.batches.append(list(data))
+        return super().adapt_data_batch(data)
+
+    async def make_buy_transaction(self):
+        self.orders.append((self._last_candle["Date"], -1))
+        await super().make_buy_transaction()
+
+    async def make_sell_transaction(self):
+        self.orders.append((self._last_candle["Date"], 1))
+        await super().make_sell_transaction()
+
+# Synchronous Trader recording the orders it makes
+class SyncTrader(Trader):
+    def __init__(self, predictor):
+        super().__init__(predictor, processor_incremental = True)
+
+        self.orders = []
+        self._last_candle = None
+
+    def adapt_data(self, data):
+        self._last_candle = data[-1]
+        return pd.DataFrame(data)
+
+    def make_buy_transaction(self):
+        self.orders.append((self._last_candle["Date"], -1))
+
+    def make_sell_transaction(self):
+        self.orders.append((self._last_candle["Date"], 1))
+
+@pytest.mark.parametrize("burst_size", [1, 24])
+def test_async_orders_match_sync_trader(model_file, df_candles, burst_size):
+    exchange = SimulatedExchange(latency = 0.0005)
+    trader = RecordingTrader(make_predictor(model_file), exchange)
+    asyncio.run(trader.run(simulated_feed(df_candles, interval = 0.001, burst_size = burst_size)))
+
+    stats = trader.get_stats()
+    assert stats["received"] == len(df_candles)
+    assert stats["updates"] == len(trader.batches)
+    assert sum(len(batch) for batch in trader.batches) == len(df_candles)
+
+    # The synchronous Trader is updated with the same candles in the same updates, and
+    # makes a transaction once there are rows past the warm up
+    sync_trader = SyncTrader(make_predictor(model_file))
+    warmup = data_processor.warmup_rows(data_processor.indicator_config(data_hourly = True))
+    received = 0
+
+    for batch in trader.batches:
+        sync_trader.update_data(batch)
+        received += len(batch)
+        if received > warmup:
+            sync_trader.make_transaction()
+
+    assert len(sync_trader.orders) > 0
+    assert trader.orders == sync_trader.orders
+    assert stats["orders"] == len(trader.orders)
+
+    # The exchange fills every buy with a balance and every sell with units
+    df_orders = exchange.get_orders()
+    assert set(zip(df_orders["Date"], df_orders["Extrema"])) <= set(trader.orders)
+
+class FailingTrader(RecordingTrader):
+    def __init__(self, *args, fail_in, fail_after, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._fail_in = fail_in
+        self._fail_after = fail_after
+
+    def adapt_data_batch(self, data):
+        if self._fail_in == "update" and data[-1]["Date"] >= self._fail_after:
+            raise ValueError("Invalid candle")
+        return super().adapt_data_batch(data)
+
+    async def make_buy_transaction(self):
+        if self._fail_in == "order":
+            raise ValueError("Order rejected")
+        await super().make_buy_transaction()
+
+@pytest.mark.parametrize("fail_in", ["update", "order"])
+def test_async_error_reaches_caller(model_file, df_candles, fail_in):
+    fail_after = df_candles["Date"].iloc[100]
+    trader = FailingTrader(make_predictor(model_file), SimulatedExchange(), fail_in = fail_in, fail_after = fail_after)
+
+    with pytest.raises(ValueError):
+        asyncio.run(trader.run(simulated_feed(df_candles, interval = 0.001, burst_size = 24)))
+
+    # The feed stops being consumed once the error is raised
+    assert trader.get_stats()["received"] < len(df_candles)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtest_strategy as strategy
+
+# Regression tests of the vectorized strategies against the row by row implementations
+# they replaced, run with: python -m pytest
+
+# Original row by row strategies, kept as the reference
+def reference_alternate_extremas(df, sell_at_loss = False):
+    remove_extremas = []
+    prev_type = 1
+    prev_value = 0
+
+    for i, row in df.iterrows():
+        extrema_type = row["Extrema"]
+        value = row["HLCAverage"]
+        if extrema_type == 0:
+            continue
+        elif extrema_type == prev_type or ((not sell_at_loss) and extrema_type == 1 and value < prev_value):
+            remove_extremas.append(i)
+            continue
+
+        prev_type, prev_value = extrema_type, value
+
+    df.loc[remove_extremas, "Extrema"] = 0
+    return len(remove_extremas)
+
+def reference_end_with_sell(df):
+    last_extrema = df[df["Extrema"] != 0][::-1].iloc[0]
+    if last_extrema["Extrema"] == -1:
+        df.loc[last_extrema.name, "Extrema"] = 0
+
+def reference_tx_summary(df):
+    def profit_loss(current_val, start_val):
+        return ((current_val - start_val) / start_val) * 100
+
+    summary = []
+    units_owned = None
+    current_val = start_val = 0
+
+    for i, row in df[df["Extrema"] != 0].iterrows():
+        extrema_type = row["Extrema"]
+        value = row["HLCAverage"]
+
+        if extrema_type == -1:
+            if units_owned is None:
+                units_owned = 1
+                start_val = current_val = value
+            else:
+                units_owned = current_val / value
+        else:
+            current_val = value * units_owned
+            units_owned = 0
+
+        summary.append((row["Date"], extrema_type, units_owned, current_val, profit_loss(current_val, start_val)))
+
+    return pd.DataFrame(summary, columns = ["Date", "Extrema", "UnitsOwned", "Value", "ProfitLoss"])
+
+def random_predictions(rows, seed = 0, density = 0.3):
+    rng = np.random.default_rng(seed)
+    extremas = rng.choice([-1.0, 0.0, 1.0], size = rows, p = [density / 2, 1 - density, density / 2])
+
+    return pd.DataFrame({
+        "Date": pd.date_range("2019-01-01", periods = rows, freq = "h"),
+        "HLCAverage": 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows))),
+        "Extrema": extremas
+    })
+
+def run_strategies(df, alternate, end_with_sell, tx_summary, sell_at_loss):
+    removed = alternate(df, sell_at_loss)
+    if not (df["Extrema"] != 0).any():
+        return removed, None
+
+    end_with_sell(df)
+    return removed, tx_summary(df)
+
+@pytest.mark.parametrize("sell_at_loss", [False, True])
+@pytest.mark.parametrize("seed, density", [(0, 0.3), (1, 0.05), (2, 0.9), (3, 1.0)])
+def test_strategies_match_reference(seed, density, sell_at_loss):
+    df = random_predictions(500, seed, density)
+    df_reference = df.copy()
+
+    removed, df_summary = run_strategies(
+        df, strategy.alternate_extremas, strategy.end_with_sell, strategy.generate_tx_summary, sell_at_loss
+    )
+    reference_removed, df_reference_summary = run_strategies(
+        df_reference, reference_alternate_extremas, reference_end_with_sell, reference_tx_summary, sell_at_loss
+    )
+
+    assert removed == reference_removed
+    pd.testing.assert_frame_equal(df, df_reference)
+    if df_reference_summary is not None:
+        pd.testing.assert_frame_equal(df_summary, df_reference_summary)
+
+@pytest.mark.parametrize("sell_at_loss", [False, True])
+def test_alternate_extremas_nan(sell_at_loss):
+    # NaN extremas are never equal to the previous type, so they are always kept
+    df = random_predictions(300, seed = 4)
+    df.loc[[0, 10, 11, 150, 299], "Extrema"] = np.nan
+    df_reference = df.copy()
+
+    removed = strategy.alternate_extremas(df, sell_at_loss)
+    reference_removed = reference_alternate_extremas(df_reference, sell_at_loss)
+
+    assert removed == reference_removed
+    assert df["Extrema"].isna().sum() == 5
+    pd.testing.assert_frame_equal(df, df_reference)
+
+    strategy.end_with_sell(df)
+    reference_end_with_sell(df_reference)
+    pd.testing.assert_frame_equal(df, df_reference)
+
+def test_alternate_extremas_equal_prices():
+    # A sell at the same price as the buy is not at a loss
+    df = pd.DataFrame({ "HLCAverage": [5.0, 5.0, 4.0, 4.0, 6.0], "Extrema": [-1.0, 1.0, -1.0, -1.0, 1.0] })
+    df_reference = df.copy()
+
+    assert strategy.alternate_extremas(df) == reference_alternate_extremas(df_reference) == 1
+    pd.testing.assert_frame_equal(df, df_reference)
+
+def test_simulate_variants():
+    df = random_predictions(400, seed = 5)
+    rng = np.random.default_rng(5)
+    variants = np.array([rng.choice([-1.0, 0.0, 0.0, 0.0, 1.0], len(df)) for _ in range(12)] + [np.zeros(len(df))])
+    prices = df["HLCAverage"].to_numpy()
+
+    final, transactions, extremas = strategy.simulate(variants, prices)
+
+    for variant, variant_final, variant_transactions, variant_extremas in zip(variants, final, transactions, extremas):
+        df_variant = df.assign(Extrema = variant)
+        _, df_summary = run_strategies(
+            df_variant, reference_alternate_extremas, reference_end_with_sell, reference_tx_summary, False
+        )
+
+        np.testing.assert_array_equal(variant_extremas, df_variant["Extrema"].to_numpy())
+        assert variant_transactions == (0 if df_summary is None else len(df_summary))
+        if df_summary is None:
+            assert np.isnan(variant_final)
+        else:
+            assert variant_final == df_summary["ProfitLoss"].iloc[-1]
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import candles
+import data_processor
+
+# Tests of candle aggregation against pandas resampling, and of the row by row
+# aggregator against the batch one, run with: python -m pytest
+
+DATA_FILE = "datasets/Coinbase_BTCUSD_1h.csv"
+
+INTERVALS = ["2h", "4h", "1D", "7D"]
+
+@pytest.fixture(scope = "module")
+def df_hourly():
+    df = data_processor.read_csv(DATA_FILE)
+    return df[(df["Date"] >= "2019-01-01") & (df["Date"] < "2019-04-01")].reset_index(drop = True)
+
+# Hourly candles with missing hours and days, and missing volumes
+@pytest.fixture(scope = "module")
+def df_gaps(df_hourly):
+    rng = np.random.default_rng(0)
+    df = df_hourly[rng.random(len(df_hourly)) > 0.3].copy()
+    df = df[(df["Date"] < "2019-02-10") | (df["Date"] >= "2019-02-20")]
+    df.loc[df.index[rng.random(len(df)) < 0.05], "Volume"] = np.nan
+    return df.reset_index(drop = True)
+
+def pandas_resample(df, interval):
+    aggregation = { column: "first" for column in df.columns if column != "Date" }
+    aggregation.update({ "Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum" })
+    aggregation.update({ column: "sum" for column in df.columns if column.startswith("Volume ") })
+
+    # Bins are counted from the epoch as by candles.resample, and bins without any
+    # candles are left out
+    resampled = df.resample(interval, on = "Date", origin = "epoch")
+    df_expected = resampled.agg(aggregation)[resampled["Close"].count() > 0]
+
+    return df_expected.reset_index()[df.columns]
+
+@pytest.mark.parametrize("interval", INTERVALS)
+@pytest.mark.parametrize("data", ["df_hourly", "df_gaps"])
+def test_resample_matches_pandas(request, data, interval):
+    df = request.getfixturevalue(data)
+
+    df_resampled = candles.resample(df, interval)
+
+    pd.testing.assert_frame_equal(df_resampled, pandas_resample(df, interval), check_dtype = False)
+
+def test_resample_unsorted_and_empty(df_gaps):
+    df_expected = candles.resample(df_gaps, "1D")
+
+    pd.testing.assert_frame_equal(candles.resample(df_gaps.iloc[::-1], "1D"), df_expected)
+    assert len(candles.resample(df_gaps.iloc[:0], "1D")) == 0
+
+def test_resample_many(df_gaps):
+    resampled = candles.resample_many(df_gaps, INTERVALS)
+
+    assert list(resampled) == INTERVALS
+    for interval, df in resampled.items():
+        pd.testing.assert_frame_equal(df, candles.resample(df_gaps, interval), obj = interval)
+
+@pytest.mark.parametrize("interval", INTERVALS)
+@pytest.mark.parametrize("data", ["df_hourly", "df_gaps"])
+def test_aggregator_matches_resample(request, data, interval):
+    df = request.getfixturevalue(data)
+    aggregator = candles.CandleAggregator(interval)
+
+    completed = []
+    for i, candle in enumerate(df.to_dict("records")):
+        candle = aggregator.update(candle)
+        if candle is not None:
+            completed.append(candle)
+
+        # The current candle is the last resampled candle of the rows so far
+        if i % 97 == 0:
+            current = candles.resample(df.iloc[:i + 1], interval).iloc[-1].to_dict()
+            pd.testing.assert_series_equal(pd.Series(aggregator.get_current()), pd.Series(current))
+    completed.append(aggregator.flush())
+
+    assert aggregator.get_current() is None
+    pd.testing.assert_frame_equal(pd.DataFrame(completed, columns = df.columns), candles.resample(df, interval), check_dtype = False)
+
+def test_aggregator_ignores_late_candles(df_hourly):
+    aggregator = candles.CandleAggregator("1D")
+    rows = df_hourly.to_dict("records")
+
+    for candle in rows[:30]:
+        aggregator.update(candle)
+    current = aggregator.get_current()
+
+    # A candle of the previous day arriving late does not change the current candle
+    assert aggregator.update(rows[0]) is None
+    assert aggregator.get_current() == current
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from compiled_tree import CompiledTree
+
+import compiled_tree
+
+# Tests that CompiledTree predicts the same classes as the sklearn model it is compiled
+# from, run with: python -m pytest
+
+def random_model(seed = 0, missing = False):
+    rng = np.random.default_rng(seed)
+
+    features = rng.normal(size = (3000, 6))
+    target = np.where(features[:, 0] + rng.normal(0, 0.5, 3000) > 0.5, 1.0, np.where(features[:, 1] < -0.5, -1.0, 0.0))
+    if missing:
+        features[rng.random(features.shape) < 0.05] = np.nan
+
+    return DecisionTreeClassifier(random_state = seed).fit(features, target)
+
+def random_features(rows, seed = 1, missing = False):
+    rng = np.random.default_rng(seed)
+
+    features = rng.normal(size = (rows, 6))
+    if missing:
+        features[rng.random(features.shape) < 0.05] = np.nan
+    return features
+
+@pytest.mark.parametrize("missing", [False, True])
+def test_predict_matches_model(missing):
+    model = random_model(missing = missing)
+    features = random_features(2000, missing = missing)
+
+    np.testing.assert_array_equal(CompiledTree.from_model(model).predict(features), model.predict(features))
+
+@pytest.mark.parametrize("missing", [False, True])
+def test_predict_without_numba(monkeypatch, missing):
+    model = random_model(missing = missing)
+    features = random_features(2000, missing = missing)
+
+    # The level by level NumPy walk used when Numba is not installed
+    monkeypatch.setattr(compiled_tree, "WALK_COMPILED", False)
+    np.testing.assert_array_equal(CompiledTree.from_model(model).predict(features), model.predict(features))
+
+@pytest.mark.parametrize("missing", [False, True])
+def test_predict_one_matches_model(missing):
+    model = random_model(missing = missing)
+    features = random_features(200, missing = missing)
+    tree = CompiledTree.from_model(model)
+
+    np.testing.assert_array_equal([tree.predict_one(row) for row in features], model.predict(features))
+
+def test_predict_float32_thresholds():
+    # Features are compared at float32 precision as in sklearn, so values just above a
+    # threshold in float64 can still go left
+    model = random_model()
+    thresholds = model.tree_.threshold[model.tree_.feature >= 0]
+    features = random_features(len(thresholds))
+    features[:, 0] = np.nextafter(thresholds, np.inf)
+
+    np.testing.assert_array_equal(CompiledTree.from_model(model).predict(features), model.predict(features))
+
+def test_save_load(tmp_path):
+    model = random_model()
+    features = random_features(500)
+    file = str(tmp_path / "model.npz")
+
+    CompiledTree.from_model(model).save(file)
+    np.testing.assert_array_equal(CompiledTree.load(file).predict(features), model.predict(features))
@@ -0,0 +1,75 @@
+import os
+
+import pandas as pd
+
+import data_cache
+import data_processor
+
+# Tests that cached dataframes are the same as the ones they were derived as, and that
+# changing the data set file or the parameters does not return stale data, run with:
+# python -m pytest
+
+DATA_FILE = "datasets/Coinbase_BTCUSD_d.csv"
+
+def counting_create(df):
+    calls = []
+
+    def create():
+        calls.append(1)
+        return df
+
+    return create, calls
+
+def test_read_data_cache_hit_matches_cold_run(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    kwargs = dict(data_year_range = (2018,), data_condensed = True, data_hourly = False)
+
+    df = data_processor.read_data(DATA_FILE, **kwargs)
+    df_cold = data_processor.read_data(DATA_FILE, cache_dir = cache_dir, **kwargs)
+    df_hit = data_processor.read_data(DATA_FILE, cache_dir = cache_dir, **kwargs)
+
+    pd.testing.assert_frame_equal(df_cold, df)
+    pd.testing.assert_frame_equal(df_hit, df)
+
+def test_changed_params_miss(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    create, calls = counting_create(pd.DataFrame({ "Value": [1.0, 2.0] }))
+
+    data_cache.load_or_create(cache_dir, DATA_FILE, ["params", 1], create)
+    data_cache.load_or_create(cache_dir, DATA_FILE, ["params", 1], create)
+    assert len(calls) == 1
+
+    data_cache.load_or_create(cache_dir, DATA_FILE, ["params", 2], create)
+    assert len(calls) == 2
+
+def test_changed_file_misses(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    data_file = str(tmp_path / "data.csv")
+    with open(data_file, "w") as f:
+        f.write("a\n")
+
+    create, calls = counting_create(pd.DataFrame({ "Value": [1.0, 2.0] }))
+    data_cache.load_or_create(cache_dir, data_file, [], create)
+
+    # A file of the same size but a different modification time, then a different size
+    stat = os.stat(data_file)
+    os.utime(data_file, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    data_cache.load_or_create(cache_dir, data_file, [], create)
+    assert len(calls) == 2
+
+    with open(data_file, "a") as f:
+        f.write("b\n")
+    os.utime(data_file, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    data_cache.load_or_create(cache_dir, data_file, [], create)
+    assert len(calls) == 3
+
+def test_processing_version_misses(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    kwargs = dict(data_year_range = (2019,), data_hourly = False, cache_dir = cache_dir)
+
+    data_processor.read_data(DATA_FILE, **kwargs)
+    entries = len(os.listdir(cache_dir))
+
+    monkeypatch.setattr(data_processor, "PROCESSING_VERSION", data_processor.PROCESSING_VERSION + 1)
+    data_processor.read_data(DATA_FILE, **kwargs)
+    assert len(os.listdir(cache_dir)) == entries + 1
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_processor
+
+# Tests that loading a date range straight from the data set gives the same rows and
+# dtypes as selecting it from the whole (cached) data set, and tests of date parsing,
+# interval detection, compact and IndicatorFrame, run with: python -m pytest
+
+DATA_FILE = "datasets/Coinbase_BTCUSD_1h.csv"
+
+@pytest.fixture(scope = "module")
+def df_full():
+    return data_processor.read_csv(DATA_FILE, skip_columns = data_processor.UNUSED_CSV_COLUMNS)
+
+@pytest.mark.parametrize("chunk_size", [5, 10000])
+@pytest.mark.parametrize("start_time, end_time", [
+    ("2019-03-01", "2019-03-02"),
+    # Before the first row, after the last row and between two rows
+    ("2000-01-01", "2001-01-01"),
+    ("2030-01-01", "2031-01-01"),
+    ("2019-03-01 05:30", "2019-03-01 05:40")
+])
+def test_read_csv_range_matches_select_range(df_full, start_time, end_time, chunk_size):
+    start_time, end_time = pd.Timestamp(start_time), pd.Timestamp(end_time)
+
+    df = data_processor.read_csv_range(DATA_FILE, start_time, end_time, data_processor.WARMUP_DAYS,
+        chunk_size = chunk_size, skip_columns = data_processor.UNUSED_CSV_COLUMNS)
+    df_selected = data_processor.select_range(df_full, start_time, end_time, data_processor.WARMUP_DAYS).reset_index(drop = True)
+
+    pd.testing.assert_frame_equal(df, df_selected)
+
+@pytest.mark.parametrize("dates, expected", [
+    (["2019-12-22", "2020-02-29", "2019-01-01"], ["2019-12-22", "2020-02-29", "2019-01-01"]),
+    # 12 AM is the start of the day, 12 PM is noon
+    (["2019-12-22 12-AM", "2019-12-22 01-AM", "2019-12-22 11-AM", "2019-12-22 12-PM", "2019-12-22 01-PM", "2019-12-22 11-PM"],
+     ["2019-12-22 00:00", "2019-12-22 01:00", "2019-12-22 11:00", "2019-12-22 12:00", "2019-12-22 13:00", "2019-12-22 23:00"]),
+    # Other formats are left to pandas
+    (["2019-12-22 04:30:00", "2019-12-22 04:31:00"], ["2019-12-22 04:30", "2019-12-22 04:31"])
+])
+def test_parse_dates(dates, expected):
+    parsed = data_processor.parse_dates(pd.Series(dates))
+
+    pd.testing.assert_series_equal(parsed, pd.Series(pd.to_datetime(expected)), check_names = False)
+
+def test_parse_dates_matches_pandas():
+    dates = pd.Series(pd.date_range("2016-02-27", periods = 2000, freq = "h").strftime("%Y-%m-%d %I-%p"))
+
+    np.testing.assert_array_equal(
+        data_processor.parse_dates(dates).to_numpy(), pd.to_datetime(dates, format = "%Y-%m-%d %I-%p").to_numpy()
+    )
+
+@pytest.mark.parametrize("dates", [["2019-02-30"], ["2019-12-22 13-PM"], ["2019-12-22 00-AM"]])
+def test_parse_dates_invalid(dates):
+    with pytest.raises(ValueError):
+        data_processor.parse_dates(pd.Series(dates))
+
+@pytest.mark.parametrize("freq, expected", [("D", "1D"), ("h", "1h"), ("4h", "4h"), ("min", "1min"), ("7D", "7D")])
+def test_detect_interval(freq, expected):
+    dates = pd.Series(pd.date_range("2019-01-01", periods = 50, freq = freq))
+    # A few missing rows do not change the interval
+    dates = dates.drop([10, 11, 12, 30])
+
+    assert data_processor.detect_interval(pd.DataFrame({ "Date": dates })) == pd.Timedelta(expected)
+    assert data_processor.detect_interval(pd.DataFrame({ "Date": dates[::-1] })) == pd.Timedelta(expected)
+
+def test_detect_interval_single_row():
+    df = pd.DataFrame({ "Date": pd.to_datetime(["2019-01-01"]) })
+
+    assert data_processor.detect_interval(df) is None
+    assert data_processor.data_interval(df) == pd.Timedelta(days = 1)
+
+@pytest.mark.parametrize("freq, time_multiplier", [("1D", 1), ("1h", 24), ("1min", 1440)])
+def test_read_data_from_df_detects_interval(freq, time_multiplier):
+    rows = 30 * time_multiplier + 100
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, rows)))
+    df = pd.DataFrame({
+        "Date": pd.date_range("2019-01-01", periods = rows, freq = freq),
+        "High": close, "Low": close, "Close": close, "Volume": rng.uniform(0, 10, rows)
+    })
+
+    # The first 30 days of rows are removed, and the periods are scaled to the interval
+    df_processed = data_processor.read_data_from_df(df.copy(), extrema_enabled = False)
+    config = data_processor.indicator_config(interval = freq)
+    df_expected = data_processor.read_data_from_df(df.copy(), extrema_enabled = False, interval = freq)
+
+    assert config.time_multiplier == time_multiplier
+    assert len(df_processed) == 100
+    pd.testing.assert_frame_equal(df_processed, df_expected)
+
+def test_compact():
+    df = data_processor.read_data(DATA_FILE, data_hourly = True, start_time = "2019-01-01", end_time = "2019-03-01")
+    df_compact = data_processor.compact(df)
+
+    # Directions are int8 with 0 for none, where the full frame has NaN
+    for column in data_processor.DIRECTION_COLUMNS:
+        assert df_compact[column].dtype == np.int8
+        assert df[column].isna().any()
+        assert (df_compact[column] == df[column].fillna(0)).all()
+
+    # Every other value round trips within float32 precision
+    for column in df.columns.difference(data_processor.DIRECTION_COLUMNS + ["Date"]):
+        assert df_compact[column].dtype == np.float32
+        np.testing.assert_allclose(df_compact[column].astype(np.float64), df[column], rtol = 1e-6)
+
+    pd.testing.assert_series_equal(df_compact["Date"], df["Date"])
+    assert df_compact.memory_usage(deep = True).sum() < df.memory_usage(deep = True).sum() / 2
+
+@pytest.fixture(scope = "module")
+def df_2019(df_full):
+    return data_processor.select_range(df_full, pd.Timestamp("2019-01-01"), pd.Timestamp("2019-04-01"),
+        data_processor.WARMUP_DAYS).reset_index(drop = True)
+
+@pytest.mark.parametrize("fused_indicators", [False, True])
+@pytest.mark.parametrize("data_condensed", [False, True])
+@pytest.mark.parametrize("columns", [["RSI"], ["MACDSignal"], ["EMACrossDirection", "OBV"], ["MACDCrossDifference", "Extrema"]])
+def test_indicator_frame_columns(df_2019, columns, data_condensed, fused_indicators):
+    df_all = data_processor.IndicatorFrame(df_2019, data_condensed, True, fused_indicators = fused_indicators).get_df()
+    frame = data_processor.IndicatorFrame(df_2019, data_condensed, True, fused_indicators = fused_indicators)
+    df = frame.get_df(columns)
+
+    # Only the requested columns and Extrema are returned, equal to the full frame's
+    expected = ["Date", "Volume"] + [column for column in data_processor.IndicatorFrame.COLUMNS if column in columns + ["Extrema"]]
+    assert list(df.columns) == expected
+    pd.testing.assert_frame_equal(df, df_all[expected])
+
+    # The columns they depend on were generated on the way, with the same values
+    for column in data_processor.IndicatorFrame.required_columns(columns):
+        pd.testing.assert_series_equal(frame.get_column(column), df_all[column])
+
+def test_indicator_frame_required_columns():
+    assert data_processor.IndicatorFrame.required_columns(["MACDCrossDirection"]) == ["HLCAverage", "MACD", "MACDSignal", "MACDCrossDirection"]
+    assert data_processor.IndicatorFrame.required_columns(["RSI", "EMA30"]) == ["HLCAverage", "EMA30", "RSI"]
+
+def test_indicator_frame_unknown_column(df_2019):
+    frame = data_processor.IndicatorFrame(df_2019, data_hourly = True)
+
+    with pytest.raises(data_processor.IndicatorFrameException):
+        frame.get_df(["RSI", "Close"])
+    with pytest.raises(data_processor.IndicatorFrameException):
+        frame.get_column("Close")
+
+@pytest.mark.parametrize("columns, fused", [(["RSI"], False), (["MACDCrossDirection"], False), (["RSI", "OBV"], True), (None, True)])
+def test_indicator_frame_fused_only_for_several_groups(df_2019, monkeypatch, columns, fused):
+    calls = []
+    generate_fused = data_processor.indicators.generate_fused
+    monkeypatch.setattr(data_processor.indicators, "generate_fused", lambda *args, **kwargs: calls.append(1) or generate_fused(*args, **kwargs))
+
+    data_processor.IndicatorFrame(df_2019, data_hourly = True, fused_indicators = True).get_df(columns)
+
+    assert len(calls) == (1 if fused else 0)
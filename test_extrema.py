@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import extrema
+
+# Regression tests of local_extremas against the slicing implementation local_extrema,
+# which is kept as the reference
+
+def reference_extremas(series, n):
+    return extrema.local_extrema(series, n, np.less_equal), extrema.local_extrema(series, n, np.greater_equal)
+
+def assert_same_extremas(series, n):
+    minima, maxima = extrema.local_extremas(series, n)
+    reference_minima, reference_maxima = reference_extremas(series, n)
+
+    np.testing.assert_array_equal(minima, reference_minima)
+    np.testing.assert_array_equal(maxima, reference_maxima)
+
+@pytest.mark.parametrize("n", [0, 1, 3, 20])
+@pytest.mark.parametrize("rows", [0, 1, 5, 200])
+def test_local_extremas_matches_reference(rows, n):
+    rng = np.random.default_rng(rows * 100 + n)
+    assert_same_extremas(pd.Series(rng.normal(size = rows).cumsum()), n)
+
+@pytest.mark.parametrize("n", [1, 2, 5])
+def test_local_extremas_ties(n):
+    # Plateaus are extremas at every point for both <= and >=
+    series = pd.Series([1.0, 1.0, 2.0, 2.0, 2.0, 1.0, 1.0, 3.0, 3.0, 0.0, 0.0, 0.0])
+    assert_same_extremas(series, n)
+
+@pytest.mark.parametrize("n", [1, 3, 10])
+def test_local_extremas_nan(n):
+    series = pd.Series(np.random.default_rng(n).normal(size = 60))
+    series[[0, 7, 8, 30, 59]] = np.nan
+    assert_same_extremas(series, n)
+
+def test_local_extremas_shorter_than_window():
+    # Windows before a point wrap around when the series is shorter than n
+    assert_same_extremas(pd.Series([3.0, 1.0, 2.0, 5.0]), 6)
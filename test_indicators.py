@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+
+# Regression tests of the vectorized indicators against the row by row implementations
+# they replaced, run with: python -m pytest
+
+# Original row by row OBV, kept as the reference for generate_obv
+def reference_obv(df, price_field = "Close"):
+    df = df.copy()
+
+    for i in range(len(df)):
+        volume = df.loc[i, "Volume"]
+
+        if i == 0:
+            df.loc[i, "OBV"] = volume
+        else:
+            prev_obv = df.loc[i - 1, "OBV"]
+            prev_close = df.loc[i - 1, price_field]
+            close = df.loc[i, price_field]
+
+            df.loc[i, "OBV"] = prev_obv + (volume if close > prev_close else (-volume if close < prev_close else 0))
+
+    return df["OBV"].to_numpy()
+
+def random_ohlcv(rows, seed = 0):
+    rng = np.random.default_rng(seed)
+
+    # Prices rounded to whole numbers so that equal closes are common
+    close = np.round(100 + np.cumsum(rng.normal(0, 1, rows)))
+    return pd.DataFrame({
+        "High": close + 1, "Low": close - 1, "Close": close,
+        "Volume": rng.uniform(0, 10, rows)
+    })
+
+@pytest.mark.parametrize("rows", [1, 2, 50, 500])
+def test_obv_matches_reference(rows):
+    df = random_ohlcv(rows)
+    obv = indicators.generate_obv(df)["OBV"]
+
+    np.testing.assert_allclose(obv.to_numpy(), reference_obv(df))
+
+def test_obv_equal_closes():
+    df = pd.DataFrame({ "Close": [5.0, 5.0, 6.0, 6.0, 4.0, 4.0], "Volume": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0] })
+    obv = indicators.generate_obv(df)["OBV"]
+
+    # No change in price adds nothing
+    np.testing.assert_allclose(obv.to_numpy(), [1.0, 1.0, 4.0, 4.0, -1.0, -1.0])
+    np.testing.assert_allclose(obv.to_numpy(), reference_obv(df))
+
+def test_obv_first_row():
+    df = pd.DataFrame({ "Close": [10.0, 9.0], "Volume": [7.0, 3.0] })
+    obv = indicators.generate_obv(df)["OBV"]
+
+    # The first row starts at its own volume, whatever its price
+    assert obv.iloc[0] == 7.0
+    np.testing.assert_allclose(obv.to_numpy(), reference_obv(df))
+
+def test_obv_price_field():
+    df = random_ohlcv(100, seed = 1)
+    df["HLCAverage"] = (df["High"] + df["Low"] + df["Close"]) / 3
+    obv = indicators.generate_obv(df, indicators.IndicatorConfig("HLCAverage", 24))["OBV"]
+
+    np.testing.assert_allclose(obv.to_numpy(), reference_obv(df, "HLCAverage"))
+
+FUSED_COLUMNS = ["EMA30", "MACD", "MACDSignal", "OBV", "RSI"]
+
+def separate_indicators(df, config):
+    return df.assign(
+        **indicators.generate_ema(df, 30, config), **indicators.generate_macd(df, config),
+        **indicators.generate_obv(df, config), **indicators.generate_rsi(df, config = config)
+    )
+
+@pytest.mark.parametrize("config", [indicators.IndicatorConfig("Close", 1), indicators.IndicatorConfig("HLCAverage", 24)])
+@pytest.mark.parametrize("rows", [1, 20, 2000])
+def test_fused_matches_separate(rows, config):
+    df = random_ohlcv(rows, seed = rows)
+    df["HLCAverage"] = (df["High"] + df["Low"] + df["Close"]) / 3
+
+    expected = separate_indicators(df, config)
+    df = df.assign(**indicators.generate_fused(df, config = config))
+
+    for column in FUSED_COLUMNS:
+        np.testing.assert_array_equal(df[column].to_numpy(), expected[column].to_numpy(), err_msg = column)
+
+def test_fused_nan_and_constant_prices():
+    df = random_ohlcv(600, seed = 3)
+    df.loc[100:140, "Close"] = 50.0
+    df.loc[[0, 5, 300, 301], "Close"] = np.nan
+
+    expected = separate_indicators(df, indicators.DEFAULT_CONFIG)
+    df = df.assign(**indicators.generate_fused(df))
+
+    for column in FUSED_COLUMNS:
+        np.testing.assert_array_equal(df[column].to_numpy(), expected[column].to_numpy(), err_msg = column)
+
+def test_fused_loop_without_numba():
+    # The plain Python loop used when Numba is not installed gives the same values
+    df = random_ohlcv(300, seed = 4)
+    config = indicators.IndicatorConfig("Close", 1)
+    expected = separate_indicators(df, config)
+
+    alphas = [2 / (span + 1) for span in (30, 12, 26, 9)]
+    out = np.empty((5, len(df)))
+    indicators._fused_loop(df["Close"].to_numpy(), df["Volume"].to_numpy(), *alphas, 14, out)
+
+    for column, values in zip(FUSED_COLUMNS, out):
+        np.testing.assert_array_equal(values, expected[column].to_numpy(), err_msg = column)
+
+@pytest.mark.parametrize("normalization, window", [("expanding", None), ("rolling", 2)])
+def test_running_normalization_constant_and_empty_ranges(normalization, window):
+    reference = pd.Series([np.nan, 5.0, 5.0, 5.0, 7.0, np.nan, 7.0])
+
+    hundred = reference.copy()
+    indicators.condense_data_hundred(hundred, normalization = normalization, window = window)
+    directional = reference.copy()
+    indicators.condense_data(directional, normalization = normalization, window = window)
+
+    # No values in range: NaN; a single value in range: the middle of the condensed range
+    np.testing.assert_array_equal(hundred.to_numpy()[:5], [np.nan, 50.0, 50.0, 50.0, 100.0])
+    np.testing.assert_array_equal(directional.to_numpy()[:5], [np.nan, 0.0, 0.0, 0.0, 1.0])
+    assert np.isnan(hundred[5]) and np.isnan(directional[5])
+
+    expected_last = 100.0 if normalization == "expanding" else 50.0
+    assert hundred[6] == expected_last
+
+def test_running_normalization_no_look_ahead():
+    reference = pd.Series(np.random.default_rng(6).normal(size = 200).cumsum())
+
+    full = reference.copy()
+    indicators.condense_data_hundred(full, normalization = "expanding")
+    prefix = reference.iloc[:100].copy()
+    indicators.condense_data_hundred(prefix, normalization = "expanding")
+
+    np.testing.assert_array_equal(full.to_numpy()[:100], prefix.to_numpy())
+
+def test_generate_does_not_modify_df():
+    df = random_ohlcv(200, seed = 7)
+    df["HLCAverage"] = (df["High"] + df["Low"] + df["Close"]) / 3
+    reference = df.copy()
+
+    generated = [
+        indicators.generate_hlc(df), indicators.generate_ema(df, 30), indicators.generate_macd(df),
+        indicators.generate_obv(df), indicators.generate_rsi(df), indicators.generate_fused(df),
+        indicators.generate_cross(df["HLCAverage"], df["Close"], "Close")
+    ]
+
+    # The caller assigns the returned columns, which are indexed as df
+    pd.testing.assert_frame_equal(df, reference)
+    for columns in generated:
+        for name, values in columns.items():
+            pd.testing.assert_index_equal(values.index, df.index, obj = name)
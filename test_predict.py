@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from predict import Predict
+
+import train
+
+# Regression tests of the vectorized heuristic against the row by row implementation it
+# replaced, run with: python -m pytest
+#
+# A small model is trained on random data, as the tests only depend on the extremas it
+# predicts and not on how good they are
+
+FEATURE_COLUMNS = ["HLCAverage", "RSI", "EMACrossDifference", "EMACrossDirection", "MACDCrossDifference", "MACDCrossDirection"]
+
+@pytest.fixture(scope = "module")
+def model_file(tmp_path_factory):
+    df = random_features(2000, seed = 0)
+    model = DecisionTreeClassifier(max_depth = 6, random_state = 0).fit(df[FEATURE_COLUMNS], df["Extrema"])
+
+    file = str(tmp_path_factory.mktemp("models") / "model.joblib")
+    train.save_decision_tree(model, file)
+    return file
+
+def random_features(rows, seed = 0):
+    rng = np.random.default_rng(seed)
+
+    df = pd.DataFrame(rng.normal(size = (rows, len(FEATURE_COLUMNS))), columns = FEATURE_COLUMNS)
+    df["Extrema"] = random_extremas(rows, rng)
+    return df
+
+def random_extremas(rows, rng):
+    return rng.choice([-1, 0, 1], size = rows, p = [0.2, 0.6, 0.2]).astype(np.float64)
+
+# Original row by row heuristic, kept as the reference for validate_extremas
+def reference_validate_extremas(df, k, max_conflicts, distance):
+    bad_indices = []
+    start_offset = df.first_valid_index()
+
+    for i, row in df.iterrows():
+        extrema_type = row["Extrema"]
+        if extrema_type == 0:
+            continue
+
+        region = df.iloc[i - start_offset - distance:i - start_offset]
+        has_conflicts = len(region[region["Extrema"] == extrema_type * -1]) > max_conflicts
+        has_k_neighbors = len(region[region["Extrema"] == extrema_type]) >= k
+
+        if has_conflicts or not has_k_neighbors:
+            bad_indices.append(i)
+
+    return bad_indices
+
+@pytest.mark.parametrize("k, max_conflicts, distance", [(0, 0, 1), (2, 1, 5), (5, 2, 26), (3, 10, 60)])
+def test_validate_extremas_matches_reference(model_file, k, max_conflicts, distance):
+    predict = Predict(model_file, k_neighbors = k, max_conflicts = max_conflicts, search_distance = distance)
+    df = random_features(300, seed = distance)
+
+    assert predict.validate_extremas(df) == reference_validate_extremas(df, k, max_conflicts, distance)
+
+@pytest.mark.parametrize("start", [0, 3, 100])
+@pytest.mark.parametrize("length", [1, 10, 27])
+def test_validate_extremas_start_offset(model_file, start, length):
+    # Slices as taken by predict_point, which do not start at an index of 0 and may be
+    # shorter than the search distance
+    predict = Predict(model_file, k_neighbors = 2, max_conflicts = 1, search_distance = 26)
+    df = random_features(200, seed = 1).iloc[start:start + length].copy()
+
+    assert predict.validate_extremas(df) == reference_validate_extremas(df, 2, 1, 26)
+
+@pytest.mark.parametrize("k, max_conflicts, distance", [(0, 0, 10), (1, 3, 26), (5, 2, 26)])
+def test_predict_walk_forward_matches_predict_point(model_file, k, max_conflicts, distance):
+    predict = Predict(model_file, k_neighbors = k, max_conflicts = max_conflicts, search_distance = distance)
+    df = random_features(150, seed = 2)
+    df_features = Predict.feature_attributes(df)
+
+    expected = [predict.predict_point(df, df_features, i) for i in range(len(df))]
+
+    df_walk_forward = df.copy()
+    removed = predict.predict_walk_forward(df_walk_forward, df_features)
+
+    np.testing.assert_array_equal(df_walk_forward["Extrema"].to_numpy(), expected)
+    assert removed == np.count_nonzero(predict.predict_array(df_features)) - np.count_nonzero(expected)
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+import profiler
+
+# Tests of the stages recorded by the profiler and of its command line summary, run
+# with: python -m pytest
+
+@pytest.fixture(autouse = True)
+def clean_profiler():
+    profiler.reset()
+    yield
+    profiler.disable()
+    profiler.reset()
+
+def test_disabled_records_nothing():
+    with profiler.stage("outer", 10) as stage:
+        stage.set_rows(20)
+
+    assert not profiler.is_enabled()
+    assert len(profiler.get_summary()) == 0
+    assert list(profiler.get_summary().columns) == profiler.SUMMARY_COLUMNS
+
+def test_nested_stages():
+    profiler.enable()
+
+    with profiler.stage("outer", 100):
+        for _ in range(3):
+            with profiler.stage("inner", 10):
+                with profiler.stage("leaf") as stage:
+                    stage.set_rows(5)
+        with profiler.stage("other"):
+            pass
+    with profiler.stage("inner", 1):
+        pass
+
+    df_summary = profiler.get_summary().set_index("Stage")
+
+    # Stages are named after the stages they are within, in the order first entered
+    assert list(df_summary.index) == ["outer/inner/leaf", "outer/inner", "outer/other", "outer", "inner"]
+    assert df_summary["Calls"].to_dict() == {
+        "outer/inner/leaf": 3, "outer/inner": 3, "outer/other": 1, "outer": 1, "inner": 1
+    }
+    assert df_summary.loc["outer/inner", "Rows"] == 30
+    assert df_summary.loc["outer/inner/leaf", "Rows"] == 15
+    assert df_summary["Rows"].isna().sum() == 1
+
+    # An enclosing stage takes at least as long as the stages within it
+    assert df_summary.loc["outer", "Seconds"] >= df_summary.loc[["outer/inner", "outer/other"], "Seconds"].sum()
+    assert df_summary.loc["outer/inner", "Seconds"] >= df_summary.loc["outer/inner/leaf", "Seconds"]
+
+def test_memory_of_nested_stages():
+    profiler.enable(trace_memory = True)
+
+    with profiler.stage("outer"):
+        with profiler.stage("inner"):
+            data = bytearray(4 * 2 ** 20)
+        del data
+
+    df_summary = profiler.get_summary().set_index("Stage")
+
+    # The peak of the inner stage is part of the peak of the outer stage
+    assert df_summary.loc["outer/inner", "PeakMemoryMB"] >= 4
+    assert df_summary.loc["outer", "PeakMemoryMB"] >= df_summary.loc["outer/inner", "PeakMemoryMB"]
+
+def test_run_main_json(capsys):
+    def main():
+        with profiler.stage("work", 7):
+            print("main output")
+        return 42
+
+    assert profiler.run_main(main, ["--profile", "json"]) == 42
+    assert not profiler.is_enabled()
+
+    output = capsys.readouterr().out
+    assert output.startswith("main output\n")
+
+    summary = json.loads(output[len("main output\n"):])
+    assert [record["Stage"] for record in summary] == ["main/work", "main"]
+    assert set(summary[0]) == set(profiler.SUMMARY_COLUMNS)
+    assert summary[0]["Calls"] == 1 and summary[0]["Rows"] == 7
+    assert summary[1]["Rows"] is None and summary[1]["PeakMemoryMB"] is None
+
+def test_run_main_without_profile(capsys):
+    assert profiler.run_main(lambda: 1, []) == 1
+    assert capsys.readouterr().out == ""
+    assert len(profiler.get_summary()) == 0
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stream_processor import StreamProcessor
+
+import data_processor
+
+# Tests that processing rows one at a time gives the same dataframe as processing the
+# whole data set at once with data_processor.read_data_from_df, run with: python -m pytest
+
+def random_ohlcv(rows, seed = 0, freq = "D"):
+    rng = np.random.default_rng(seed)
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, rows)))
+    return pd.DataFrame({
+        "Date": pd.date_range("2019-01-01", periods = rows, freq = freq),
+        "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+        "Volume": rng.uniform(0, 10, rows)
+    })
+
+def read_batch(df, data_condensed, data_hourly, normalization, window):
+    return data_processor.read_data_from_df(df.copy(), data_condensed, data_hourly, extrema_enabled = False,
+        normalization = normalization, normalization_window = window)
+
+NORMALIZATIONS = [("global", None), ("expanding", None), ("rolling", 50)]
+
+@pytest.mark.parametrize("normalization, window", NORMALIZATIONS)
+@pytest.mark.parametrize("data_condensed", [False, True])
+def test_stream_matches_batch(data_condensed, normalization, window):
+    df = random_ohlcv(400)
+
+    stream = StreamProcessor(data_condensed, False, normalization, window)
+    for _, row in df.iterrows():
+        stream.update(row)
+
+    expected = read_batch(df, data_condensed, False, normalization, window)
+    pd.testing.assert_frame_equal(stream.get_data(), expected, check_exact = False, rtol = 1e-9)
+    pd.testing.assert_frame_equal(stream.get_data(27), expected.iloc[-27:], check_exact = False, rtol = 1e-9)
+
+@pytest.mark.parametrize("normalization, window", NORMALIZATIONS)
+def test_stream_matches_batch_hourly(normalization, window):
+    df = random_ohlcv(1000, seed = 1, freq = "h")
+
+    stream = StreamProcessor(True, True, normalization, window)
+    stream.extend(df)
+
+    expected = read_batch(df, True, True, normalization, window)
+    pd.testing.assert_frame_equal(stream.get_data(), expected, check_exact = False, rtol = 1e-9)
+
+@pytest.mark.parametrize("normalization, window", NORMALIZATIONS)
+def test_stream_replaces_last_row(normalization, window):
+    df = random_ohlcv(300, seed = 2)
+    rng = np.random.default_rng(2)
+
+    # Every candle is first received while still forming, then with its final values
+    stream = StreamProcessor(True, False, normalization, window)
+    for _, row in df.iterrows():
+        for scale in rng.uniform(0.9, 1.1, 2):
+            forming = row.copy()
+            forming[["High", "Low", "Close"]] *= scale
+            stream.update(forming)
+        stream.update(row)
+
+    expected = read_batch(df, True, False, normalization, window)
+    pd.testing.assert_frame_equal(stream.get_data(), expected, check_exact = False, rtol = 1e-9)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+
+from predict import Predict
+from sweep import SharedFrame
+
+import data_processor
+import sweep
+import train
+
+# Tests of the shared memory frame and of the parallel sweep against a serial loop over
+# the same grid, run with: python -m pytest
+
+def random_dataset(file, start = "2016-06-01", end = "2019-12-31", seed = 0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, end, freq = "D")
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.03, len(dates))))
+
+    # Same layout as the bundled data sets: a line before the header, dates descending
+    df = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%d"), "Symbol": "BTCUSD",
+        "Open": close, "High": close * 1.02, "Low": close * 0.98, "Close": close,
+        "Volume BTC": rng.uniform(100, 1000, len(dates)), "Volume USD": rng.uniform(1e5, 1e6, len(dates))
+    }).iloc[::-1]
+
+    with open(file, "w") as f:
+        f.write("Random data set\n")
+        df.to_csv(f, index = False)
+
+def test_shared_frame_round_trip():
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({
+        "Date": pd.date_range("2019-01-01", periods = 100, freq = "h"),
+        "HLCAverage": rng.normal(size = 100),
+        "RSI": rng.uniform(0, 100, 100),
+        "Extrema": rng.choice([-1.0, 0.0, 1.0, np.nan], 100)
+    })
+
+    shared = SharedFrame.create(df)
+    try:
+        attached = SharedFrame.attach(shared.get_spec())
+        pd.testing.assert_frame_equal(attached.get_df(), df)
+
+        # Extrema is a copy which can be changed without changing the shared data
+        df_shared = attached.get_df()
+        df_shared["Extrema"] = 0.0
+        pd.testing.assert_frame_equal(attached.get_df(), df)
+        attached._shm.close()
+    finally:
+        shared.unlink()
+
+def test_sweep_matches_serial_loop(tmp_path, monkeypatch):
+    data_file = str(tmp_path / "data.csv")
+    random_dataset(data_file)
+
+    # Trees are trained with a fixed random state so both runs train the same models
+    monkeypatch.setattr(train, "make_decision_tree", lambda x, y: DecisionTreeClassifier(random_state = 0).fit(x, y))
+    grid = { "extrema_n": [5], "k_neighbors": [0, 1], "max_conflicts": [0, 2], "search_distance": [5] }
+
+    df_results = sweep.run_sweep(grid, data_file, data_hourly = False, processes = 2)
+
+    df_train = data_processor.read_data(data_file, (2017, 2018), True, False, extrema_enabled = False, columns = train.FEATURE_COLUMNS)
+    df_test = data_processor.read_data(data_file, (2019,), True, False, extrema_enabled = False, columns = train.FEATURE_COLUMNS)
+    Predict.preprocess_data(df_test)
+    model_file = sweep.train_model(df_train, 5, str(tmp_path / "model.joblib"))
+
+    expected = []
+    for k in grid["k_neighbors"]:
+        for max_conflicts in grid["max_conflicts"]:
+            profit_loss, transactions = sweep.backtest(df_test.copy(), model_file, k, max_conflicts, 5)
+            expected.append((5, k, max_conflicts, 5, profit_loss, transactions))
+
+    df_expected = pd.DataFrame(expected, columns = sweep.GRID_KEYS + ["ProfitLoss", "Transactions"])
+    sort_keys = sweep.GRID_KEYS[1:3]
+    pd.testing.assert_frame_equal(
+        df_results.sort_values(sort_keys).reset_index(drop = True),
+        df_expected.sort_values(sort_keys).reset_index(drop = True)
+    )
+    assert df_results["ProfitLoss"].nunique() == len(df_results)
+
+def test_sweep_missing_grid_keys():
+    with pytest.raises(sweep.SweepException):
+        sweep.run_sweep({ "extrema_n": [10] })
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import visualizer
+from visualizer import Visualizer
+
+# Tests of line decimation on regular, irregular and gapped series, run with:
+# python -m pytest
+
+BUCKETS = 200
+
+# Target number of points of each decimation method
+MAX_POINTS = { "minmax": 4 * BUCKETS, "lttb": BUCKETS }
+
+def random_walk(rows, seed = 0):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(size = rows))
+
+def hourly_dates(rows):
+    return pd.date_range("2019-01-01", periods = rows, freq = "h").to_numpy()
+
+def irregular_dates(rows, seed = 0):
+    rng = np.random.default_rng(seed)
+    return np.datetime64("2019-01-01") + np.cumsum(rng.exponential(3600, rows)).astype("timedelta64[s]")
+
+def gapped_dates(rows):
+    dates = hourly_dates(rows)
+    return np.where(np.arange(rows) < rows // 2, dates, dates + np.timedelta64(365, "D"))
+
+SERIES = {
+    "hourly": lambda rows: hourly_dates(rows),
+    "irregular": lambda rows: irregular_dates(rows),
+    "gapped": lambda rows: gapped_dates(rows),
+    "numbers": lambda rows: np.sort(np.random.default_rng(1).uniform(0, 1000, rows)),
+    "rows": lambda rows: None
+}
+
+@pytest.mark.parametrize("method", visualizer.DECIMATIONS)
+@pytest.mark.parametrize("series", SERIES)
+@pytest.mark.parametrize("rows", [50000, 3 * BUCKETS])
+def test_decimate_keeps_ends_and_target(method, series, rows):
+    x, y = SERIES[series](rows), random_walk(rows)
+    y[100:150] = np.nan
+
+    indices = visualizer.decimate(x, y, BUCKETS, method)
+
+    assert np.all(np.diff(indices) > 0)
+    assert indices[0] == 0 and indices[-1] == rows - 1
+    assert len(indices) <= MAX_POINTS[method]
+
+@pytest.mark.parametrize("series", SERIES)
+def test_decimate_minmax_keeps_extremes(series):
+    x, y = SERIES[series](50000), random_walk(50000, seed = 2)
+    y[:10] = np.nan
+
+    indices = visualizer.decimate(x, y, BUCKETS)
+
+    assert np.nanargmin(y) in indices
+    assert np.nanargmax(y) in indices
+
+@pytest.mark.parametrize("method", visualizer.DECIMATIONS)
+def test_decimate_buckets_on_x(method):
+    # Nine tenths of the rows are in the first tenth of x; buckets of equal ranges of x
+    # keep points across all of x rather than mostly where the rows are dense
+    x = np.r_[np.linspace(0, 1, 90000, endpoint = False), np.linspace(1, 10, 10000)]
+    y = random_walk(len(x), seed = 3)
+
+    kept = x[visualizer.decimate(x, y, BUCKETS, method)]
+    counts = np.histogram(kept, bins = 10, range = (0, 10))[0]
+
+    assert counts.min() >= counts.max() / 2
+
+def test_decimate_gap_has_no_points():
+    # Buckets within the gap have no rows, so no point is drawn inside it
+    x = gapped_dates(50000)
+    indices = visualizer.decimate(x, random_walk(50000), BUCKETS)
+
+    gap_start, gap_end = x[50000 // 2 - 1], x[50000 // 2]
+    assert not np.any((x[indices] > gap_start) & (x[indices] < gap_end))
+    assert 50000 // 2 - 1 in indices and 50000 // 2 in indices
+
+def test_decimate_unsorted_x_uses_rows():
+    x, y = irregular_dates(50000), random_walk(50000)
+
+    indices = visualizer.decimate(x[::-1], y, BUCKETS)
+
+    np.testing.assert_array_equal(indices, visualizer.decimate(None, y, BUCKETS))
+
+def test_plot_line_decimated():
+    viz = Visualizer("Test", 2, [3, 1], headless = True)
+    x, y = irregular_dates(100000), random_walk(100000)
+    keep = np.zeros(len(y), dtype = bool)
+    keep[::1000] = True
+
+    viz.fill_next_axis(lambda ax: viz.plot_line(ax, x, y, keep = keep))
+    line = viz.get_axes()[0].get_lines()[0]
+
+    width = int(viz.get_axes()[0].get_window_extent().width)
+    assert len(line.get_xdata()) <= 4 * width + keep.sum()
+    assert set(y[keep]) <= set(line.get_ydata())
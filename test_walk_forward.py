@@ -0,0 +1,39 @@
+import os
+
+from test_sweep import random_dataset
+
+import walk_forward
+
+# Tests that walk-forward windows are reused on a rerun and recomputed when the data file
+# changes, run with: python -m pytest
+
+def window_times(output_dir):
+    return {
+        file: os.stat(os.path.join(output_dir, file)).st_mtime_ns
+        for file in os.listdir(output_dir) if file.startswith("window-")
+    }
+
+def test_walk_forward_reuses_windows(tmp_path):
+    data_file = str(tmp_path / "data.csv")
+    output_dir = str(tmp_path / "walk-forward")
+    random_dataset(data_file, "2017-01-01", "2018-03-31")
+
+    def run():
+        return walk_forward.run_walk_forward(data_file, train_months = 12, output_dir = output_dir,
+            last_window = "2018-02", processes = 1, extrema_n = 5, search_distance = 5)
+
+    df_metrics = run()
+    times = window_times(output_dir)
+    assert list(df_metrics["Window"]) == ["2018-01", "2018-02"]
+    assert len(times) == 2
+
+    # A rerun with the same data file loads every window
+    df_rerun = run()
+    assert window_times(output_dir) == times
+    assert df_rerun.equals(df_metrics)
+
+    # A modified data file, even with the same contents, recomputes every window
+    stat = os.stat(data_file)
+    os.utime(data_file, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    run()
+    assert all(time > times[file] for file, time in window_times(output_dir).items())
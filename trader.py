@@ -1,5 +1,7 @@
+from predict import Predict
+from stream_processor import StreamProcessor
+
 import data_processor
-import predict
 
 # Trader is an abstract class that is meant to be inherited in order to create an
 # automated trading software for specific trading platforms
@@ -17,7 +19,8 @@ import predict
 
 class Trader:
     def __init__(self, predictor,
-            processor_data_condensed = True, processor_data_hourly = True, processor_extrema_n = 20):
+            processor_data_condensed = True, processor_data_hourly = True, processor_extrema_n = 20,
+            processor_incremental = False, processor_normalization = "global", processor_normalization_window = None):
         # Allow the data adapter and predictor to be changeable
         self.set_predictor(predictor)
 
@@ -29,6 +32,21 @@ class Trader:
         self._data_condensed = processor_data_condensed
         self._data_hourly = processor_data_hourly
         self._extrema_n = processor_extrema_n
+        self._normalization = processor_normalization
+        self._normalization_window = processor_normalization_window
+
+        # When processing incrementally, indicators are only computed for rows that have
+        # not been seen before rather than for the entire history on every update
+        #
+        # Extremas are not generated for the data in this mode; they are not used for
+        # predicting the current signal
+        #
+        # With the expanding or rolling normalization (see indicators.NORMALIZATIONS), rows
+        # that have been processed are never rescaled as the history grows; the model should
+        # then be trained on data condensed the same way
+        self._stream = StreamProcessor(
+            processor_data_condensed, processor_data_hourly, processor_normalization, processor_normalization_window
+        ) if processor_incremental else None
 
     # To be implemented by the child class
     #
@@ -67,7 +85,30 @@ class Trader:
 
     def update_data(self, data):
         # Adapt the data first before processing the data for use
-        adapted_data = self.adapt_data(data)
+        return self.update_adapted_data(self.adapt_data(data))
+
+    # Process data that has already been adapted into a dataframe compatible with the data
+    # processor module
+    def update_adapted_data(self, adapted_data):
+        if self._stream is None:
+            self._df = data_processor.read_data_from_df(adapted_data, self._data_condensed, self._data_hourly, self._extrema_n,
+                columns = Predict.FEATURE_COLUMNS, normalization = self._normalization,
+                normalization_window = self._normalization_window)
+        else:
+            self._update_stream(adapted_data)
 
-        self._df = data_processor.read_data_from_df(adapted_data, self._data_condensed, self._data_hourly, self._extrema_n)
         return Predict.preprocess_data(self._df)
+
+    # The adapted data may contain either the full history or only the newly received
+    # rows; only rows from the last processed row on are added to the stream, where a row
+    # with the date of the last processed row (e.g. the candle still forming) replaces it
+    #
+    # Only the rows needed by the predictor to determine the current signal are kept in
+    # the processed dataframe
+    def _update_stream(self, adapted_data):
+        last_date = self._stream.get_last_date()
+        if last_date is not None:
+            adapted_data = adapted_data[adapted_data["Date"] >= last_date]
+
+        self._stream.extend(adapted_data)
+        self._df = self._stream.get_data(self._predictor.get_search_distance() + 1)
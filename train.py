@@ -4,6 +4,12 @@ from sklearn.tree import DecisionTreeClassifier, export_graphviz
 import graphviz
 
 import data_processor
+import profiler
+
+# Feature attributes to train on; only these indicators are generated for training
+FEATURE_COLUMNS = [
+    "HLCAverage", "RSI", "EMACrossDifference", "EMACrossDirection", "MACDCrossDifference", "MACDCrossDirection"
+]
 
 def make_decision_tree(x, y):
     dtree = DecisionTreeClassifier()
@@ -26,11 +32,7 @@ def visualize_decision_tree(dtree, features):
     graph.format = "png"
     graph.render("trained-tree", view = True)
 
-def split_data(df, 
-            feature_columns = [
-                "HLCAverage", "RSI", "EMACrossDifference", "EMACrossDirection", "MACDCrossDifference", "MACDCrossDirection"
-            ]
-        ):
+def split_data(df, feature_columns = FEATURE_COLUMNS):
     # We want to classify into the target class of Extrema to determine if
     # it is a high or low point in price
     features = df[feature_columns]
@@ -43,18 +45,23 @@ def preprocess_data(df):
     df.fillna(0, inplace = True)
 
 def main():
-    df = data_processor.main(False)
+    df = data_processor.main(False, FEATURE_COLUMNS)
     preprocess_data(df)
 
     # Feature attributes to train on, target attribute to classify
     features, target = split_data(df)
 
-    dtree = make_decision_tree(features, target)
-    save_decision_tree(dtree)
-    visualize_decision_tree(dtree, features)
+    with profiler.stage("fit", len(features)):
+        dtree = make_decision_tree(features, target)
+
+    with profiler.stage("save"):
+        save_decision_tree(dtree)
+
+    with profiler.stage("visualize"):
+        visualize_decision_tree(dtree, features)
 
     return dtree
 
 
 if __name__ == "__main__":
-    main()
+    profiler.run_main(main)
@@ -1,8 +1,43 @@
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from pandas.plotting import register_matplotlib_converters
 import matplotlib.pyplot as plt
+import numpy as np
+
+# Lines drawn with plot_line are decimated by default to at most a few points per pixel
+# of the width of their axis, keeping the first, last, minimum and maximum point of the
+# rows falling in each pixel, so the line looks the same as with every row while taking
+# about the same time to draw for any number of rows
+#
+# Decimation happens once, at the size of the figure when the line is drawn; zooming in
+# on a shown figure does not bring back the detail, for which decimated = False should be
+# used instead
+#
+# With headless, figures are drawn on their own canvas without a display (e.g. for
+# generating reports in batch) and are only written to image files with save; pyplot and
+# any other figure are left as they are
+#
+# Sample flow / code:
+#
+# viz = Visualizer("Title", 2, [3, 1], headless = True)
+# viz.fill_next_axis(lambda ax: viz.plot_line(ax, df["Date"], df["HLCAverage"], keep = df["Extrema"] != 0))
+# viz.save("report.png")
+
+# Decimation methods: min/max keeps the first, last, minimum and maximum point of each
+# bucket; LTTB (largest triangle three buckets) keeps the single point of each bucket
+# forming the largest triangle with its neighbouring buckets, which is smoother but does
+# not always keep the minimum and maximum
+DECIMATIONS = ["minmax", "lttb"]
 
 class Visualizer:
-    def __init__(self, title, num_subplot_rows, height_ratios):
+    def __init__(self, title, num_subplot_rows, height_ratios, decimated = True, headless = False, decimation = "minmax"):
+        if decimation not in DECIMATIONS:
+            raise VisualizerException("Unknown decimation: " + str(decimation))
+
+        self._decimated = decimated
+        self._decimation = decimation
+        self._headless = headless
+
         self._configure()
         self._generate_figure(title, num_subplot_rows, height_ratios)
         self._current_axis = 0
@@ -24,6 +59,28 @@ class Visualizer:
 
         self._current_axis += 1
 
+    # Draw y against x as a line on ax, decimated to the pixel width of ax unless the
+    # visualizer is not decimated; rows where keep is true (e.g. extremas drawn on top of
+    # the line) are always kept
+    def plot_line(self, ax, x, y, *args, keep = None, **kwargs):
+        x, y = np.asarray(x), np.asarray(y, dtype = np.float64)
+
+        if self._decimated:
+            buckets = max(int(ax.get_window_extent().width), 1)
+            indices = decimate(x, y, buckets, self._decimation)
+
+            if keep is not None:
+                indices = np.union1d(indices, np.flatnonzero(np.asarray(keep)))
+
+            x, y = x[indices], y[indices]
+
+        return ax.plot(x, y, *args, **kwargs)
+
+    # Draw points of y against x on ax, e.g. extremas; every point is drawn, as markers
+    # of a single line, which draws much faster than scatter for many points
+    def plot_points(self, ax, x, y, color, marker = "o"):
+        return ax.plot(np.asarray(x), np.asarray(y), linestyle = "None", marker = marker, color = color)
+
     def get_fig(self):
         return self._fig
 
@@ -32,8 +89,18 @@ class Visualizer:
 
     # Should be called on completion of filling all axes
     def show(self):
+        if self._headless:
+            raise VisualizerException("Headless figures can only be saved")
+
         plt.show()
 
+    # Write the figure to an image file, e.g. a PNG, and release it
+    def save(self, file, dpi = None):
+        self._fig.savefig(file, dpi = dpi)
+
+        if not self._headless:
+            plt.close(self._fig)
+
     def show_last_x_axis_only(self):
         # Typically, we will have multiple graphs stacked on top of each other
         # in rows with the same x axis on all graphs
@@ -48,8 +115,98 @@ class Visualizer:
         plt.rcParams["axes.titlepad"] = 3
 
     def _generate_figure(self, title, num_subplot_rows, height_ratios):
-        self._fig, self._axes = plt.subplots(num_subplot_rows, gridspec_kw = { "height_ratios": height_ratios })
+        if self._headless:
+            # Not managed by pyplot, so it is never shown and needs no closing
+            self._fig = Figure(figsize = plt.rcParams["figure.figsize"])
+            FigureCanvasAgg(self._fig)
+            self._axes = self._fig.subplots(num_subplot_rows, gridspec_kw = { "height_ratios": height_ratios })
+        else:
+            self._fig, self._axes = plt.subplots(num_subplot_rows, gridspec_kw = { "height_ratios": height_ratios })
+
         self._fig.suptitle(title)
 
+# Returns the sorted indices of the points of y against x to keep when drawing it across
+# buckets (e.g. pixels), each covering an equal range of x, so that rows with irregular
+# intervals or gaps between them are decimated evenly; x may be numbers or dates in
+# ascending order, otherwise (or when x is None) each bucket covers an equal number of
+# consecutive rows
+#
+# At most 4 points are kept per bucket with the minmax method, or 1 with LTTB, and every
+# index is kept when y has no more rows than that
+def decimate(x, y, buckets, method = "minmax"):
+    y = np.asarray(y, dtype = np.float64)
+
+    if len(y) <= buckets * (4 if method == "minmax" else 1) or len(y) < 3:
+        return np.arange(len(y))
+
+    x = _bucket_positions(x, len(y))
+    if method == "lttb":
+        return _decimate_lttb(x, y, buckets)
+    return _decimate_minmax(x, y, buckets)
+
+def _decimate_minmax(x, y, buckets):
+    starts = _bucket_starts(x, buckets)
+    ends = np.r_[starts[1:], len(y)] - 1
+    positions = np.arange(len(y))
+
+    # The first position of each bucket holding its minimum or maximum; NaN never wins a
+    # minimum or maximum unless the whole bucket is NaN
+    indices = [starts, ends]
+    for values in (np.where(np.isnan(y), np.inf, y), np.where(np.isnan(y), np.inf, -y)):
+        extreme = np.repeat(np.minimum.reduceat(values, starts), ends - starts + 1)
+        indices.append(np.minimum.reduceat(np.where(values == extreme, positions, len(y)), starts))
+
+    return np.unique(np.concatenate(indices))
+
+def _decimate_lttb(x, y, buckets):
+    # The first and last points are always kept, and the rest are split into buckets
+    x = (x - x[0]) / max(x[-1] - x[0], np.finfo(np.float64).tiny)
+    y = np.nan_to_num(y)
+    edges = np.r_[1 + _bucket_starts(x[1:-1], max(buckets - 2, 1)), len(y) - 1]
+
+    indices = [0]
+    for i in range(len(edges) - 1):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket, or the last point for the last bucket
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        previous = indices[-1]
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        indices.append(start + int(np.argmax(areas)))
+
+    indices.append(len(y) - 1)
+    return np.unique(indices)
+
+# Returns x as ascending numbers to bucket on (dates as nanoseconds), or the row
+# positions if x is None, not numeric or not ascending
+def _bucket_positions(x, rows):
+    x = None if x is None else np.asarray(x)
+
+    if x is not None and x.dtype.kind in "mM":
+        x = x.astype("datetime64[ns]" if x.dtype.kind == "M" else "timedelta64[ns]").view(np.int64)
+    if x is None or x.dtype.kind not in "biuf" or len(x) != rows:
+        return np.arange(rows, dtype = np.float64)
+
+    x = x.astype(np.float64)
+    if not np.all(np.diff(x) >= 0):
+        return np.arange(rows, dtype = np.float64)
+    return x
+
+# Returns the first position in ascending x of each of buckets equal ranges from the
+# first to the last value of x, leaving out the ranges without any value
+def _bucket_starts(x, buckets):
+    span = x[-1] - x[0]
+    if not span > 0:
+        return np.zeros(1, dtype = np.int64)
+
+    bucket = np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+    return np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+
 class VisualizerException(Exception):
     pass
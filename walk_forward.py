@@ -0,0 +1,182 @@
+from multiprocessing import Pool
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from predict import Predict
+from sweep import SharedFrame
+
+import backtest_strategy as strategy
+import data_processor
+import train
+
+# Walk-forward retraining: for every month t of a data set, a model is trained on the
+# months [t - train_months, t) and then evaluated on month t, to show how the model
+# performs over time as it is retrained
+#
+# The data set is processed once and every window is sliced from it; windows are trained
+# and evaluated in a pool of worker processes which share the processed data through
+# shared memory. The model and metrics of every window are written to output_dir, so a
+# rerun with the same parameters only computes windows that are new, e.g. months added
+# to the data set since; every window is recomputed when the data file is modified
+#
+# The indicators are condensed with the expanding normalization by default (see
+# indicators.NORMALIZATIONS), so no window depends on the scale of later data
+#
+# Sample flow / code:
+#
+# df_metrics = run_walk_forward("datasets/Coinbase_BTCUSD_1h.csv", train_months = 12)
+
+METRIC_COLUMNS = [
+    "Window", "TrainRows", "TestRows", "Accuracy", "PredictedExtremas", "RemovedExtremas", "Transactions", "ProfitLoss"
+]
+
+METRICS_FILE = "metrics.csv"
+
+# Returns a dataframe of the metrics of every window, in order of the tested month
+#
+# Only months from first_window (e.g. "2019-01") up to and including last_window are
+# tested when given
+def run_walk_forward(data_file_path = "datasets/Coinbase_BTCUSD_1h.csv", train_months = 12,
+        output_dir = "walk-forward", first_window = None, last_window = None, processes = None,
+        data_hourly = None, extrema_n = 20, k_neighbors = 5, max_conflicts = 2, search_distance = 26,
+        normalization = "expanding", normalization_window = None, cache_dir = None):
+    # Stored windows are only reused for the same data file, as last modified, and the
+    # same processing of it
+    stat = os.stat(data_file_path)
+    params = {
+        "data_file_path": os.path.realpath(data_file_path), "data_file_mtime_ns": stat.st_mtime_ns,
+        "data_file_size": stat.st_size, "processing_version": data_processor.PROCESSING_VERSION,
+        "train_months": train_months,
+        "data_hourly": data_hourly, "extrema_n": extrema_n, "k_neighbors": k_neighbors,
+        "max_conflicts": max_conflicts, "search_distance": search_distance,
+        "normalization": normalization, "normalization_window": normalization_window
+    }
+
+    df = data_processor.read_data(
+        data_file_path, data_condensed = True, data_hourly = data_hourly, extrema_enabled = False,
+        cache_dir = cache_dir, columns = train.FEATURE_COLUMNS,
+        normalization = normalization, normalization_window = normalization_window
+    )
+
+    months = df["Date"].dt.to_period("M").unique()
+    windows = [
+        str(month) for month in months[train_months:]
+        if (first_window is None or month >= pd.Period(first_window, "M"))
+        and (last_window is None or month <= pd.Period(last_window, "M"))
+    ]
+
+    os.makedirs(output_dir, exist_ok = True)
+    results = { window: _load_window(output_dir, window, params) for window in windows }
+    jobs = [dict(params, window = window, output_dir = output_dir) for window, result in results.items() if result is None]
+
+    if jobs:
+        shared_df = SharedFrame.create(df)
+
+        try:
+            with Pool(processes, initializer = _init_worker, initargs = (shared_df.get_spec(),)) as pool:
+                for result in pool.imap_unordered(_evaluate_window, jobs):
+                    results[result["Window"]] = result
+        finally:
+            shared_df.unlink()
+
+    df_metrics = pd.DataFrame([results[window] for window in windows], columns = METRIC_COLUMNS)
+    df_metrics.to_csv(os.path.join(output_dir, METRICS_FILE), index = False)
+
+    return df_metrics
+
+# Train a model on the train_months before window and evaluate it on window, both sliced
+# from the processed dataframe df
+#
+# Returns the metrics of the window, after writing them to output_dir along with the
+# model
+def evaluate_window(df, window, output_dir, params):
+    month = pd.Period(window, "M")
+    months = df["Date"].dt.to_period("M")
+
+    df_train = _label_extremas(df[(months >= month - params["train_months"]) & (months < month)], params["extrema_n"])
+    df_test = _label_extremas(df[months == month], params["extrema_n"])
+
+    train.preprocess_data(df_train)
+    features, target = train.split_data(df_train)
+    model_file = os.path.join(output_dir, "model-{}.joblib".format(window))
+    train.save_decision_tree(train.make_decision_tree(features, target), model_file)
+
+    predict = Predict(
+        model_file,
+        k_neighbors = params["k_neighbors"],
+        max_conflicts = params["max_conflicts"],
+        search_distance = params["search_distance"]
+    )
+    Predict.preprocess_data(df_test)
+    df_features = Predict.feature_attributes(df_test)
+
+    # Accuracy is of the model itself against the extremas labelled in the test month,
+    # before the predictions are validated
+    predicted = predict.predict_array(df_features)
+    accuracy = np.mean(predicted == df_test["Extrema"].to_numpy())
+
+    removed_extremas = predict.predict_full(df_test, df_features)
+    profit_loss, transactions, _ = strategy.simulate(df_test["Extrema"].to_numpy(), df_test["HLCAverage"].to_numpy())
+
+    result = {
+        "Window": window,
+        "TrainRows": len(df_train),
+        "TestRows": len(df_test),
+        "Accuracy": float(accuracy),
+        "PredictedExtremas": int(np.count_nonzero(predicted)),
+        "RemovedExtremas": removed_extremas,
+        "Transactions": int(transactions),
+        "ProfitLoss": float(profit_loss)
+    }
+
+    with open(_window_file(output_dir, window), "w") as f:
+        json.dump({ "params": params, "metrics": result }, f)
+
+    return result
+
+# Returns a copy of df with the extremas of its own rows labelled, so that the labels of
+# a window never look ahead into the rows after it
+def _label_extremas(df, extrema_n):
+    df = df.reset_index(drop = True)
+    df["Extrema"] = np.nan
+    data_processor.generate_extremas(df, extrema_n)
+    return df
+
+def _window_file(output_dir, window):
+    return os.path.join(output_dir, "window-{}.json".format(window))
+
+# Returns the stored metrics of a window if it was computed with the same parameters and
+# its model exists, otherwise None
+def _load_window(output_dir, window, params):
+    try:
+        with open(_window_file(output_dir, window)) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if stored["params"] != params or not os.path.isfile(os.path.join(output_dir, "model-{}.joblib".format(window))):
+        return None
+
+    return stored["metrics"]
+
+# Processed data attached to once by every worker process
+_worker_frame = None
+
+def _init_worker(spec):
+    global _worker_frame
+    _worker_frame = SharedFrame.attach(spec)
+
+def _evaluate_window(job):
+    params = { key: value for key, value in job.items() if key not in ("window", "output_dir") }
+    return evaluate_window(_worker_frame.get_df(), job["window"], job["output_dir"], params)
+
+def main():
+    df_metrics = run_walk_forward(train_months = 12, cache_dir = data_processor.CACHE_DIR)
+    print(df_metrics)
+    print("Mean accuracy:", df_metrics["Accuracy"].mean())
+
+if __name__ == "__main__":
+    main()